@@ -2,6 +2,7 @@ from matplotlib import lines
 from SinisterSixSystems.orchestration.orchestrator import Orchestrator
 from SinisterSixSystems.entity import AudioRequest, ChatRequest, VideoRequest
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from langchain_core.messages import HumanMessage
 from SinisterSixSystems.logging import logger
@@ -14,11 +15,17 @@ from SinisterSixSystems.components.video_generator import create_video
 from langgraph.graph import StateGraph, START, END
 from SinisterSixSystems.utils import sanitze_filename
 from src.SinisterSixSystems.orchestration.state import AgentState
-from SinisterSixSystems.orchestration.audio_agent import AudioAgent
-
+from SinisterSixSystems.utils.registry import registry, get_audio_workflow, get_audio_agent, get_tts
+from SinisterSixSystems.utils.job_queue import JobQueue, Job
+from SinisterSixSystems.utils.artifact_cache import get_artifact_cache, get_graph_render_cache
+from SinisterSixSystems.utils.llm_cache import get_llm_response_cache
+
+from functools import partial
+import asyncio
+import json
 import os
 import re
-import subprocess
+import shutil
 
 
 app = FastAPI(title="SinisterSix")
@@ -37,95 +44,207 @@ orchestrator = Orchestrator()
 orchestrator_workflow = orchestrator.compile()
 
 
-@app.post("/chat")
-async def chat(req: ChatRequest):
-    try:
-        logger.info(f"Received chat request: {req}")
+job_queue = JobQueue()
+
+
+@app.on_event("startup")
+def warm_up_tts():
+    # Loads the TTS weights and encodes the configured voices off the request path
+    job_queue.submit("warm_up", lambda job: get_tts().warm_up())
 
-        if req.document != "":
-            logger.info("Using provided document for context.")
-            response = orchestrator_workflow.invoke({"messages": [HumanMessage(content=req.query)], "document": req.document})
+
+def publish_artifacts(urls: list) -> None:
+    """Copies finished artifacts (given by their /artifacts/... URL) into the frontend's static root."""
+    for url in urls:
+        source = os.path.join(".", url.lstrip("/"))
+        destination = os.path.join(job_queue.config.publish_dir, url.lstrip("/"))
+        try:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            shutil.copy2(source, destination)
+        except OSError as e:
+            logger.warning(f"Could not publish {url}: {e}")
+
+
+def publish_folder(folder: str) -> None:
+    """Copies a local ./artifacts/... folder to the same relative path below the frontend's static root."""
+    relative = os.path.relpath(folder, ".")
+    destination = os.path.join(job_queue.config.publish_dir, relative)
+    try:
+        # In-flight placeholder staging directories are not artifacts
+        shutil.copytree(folder, destination, dirs_exist_ok=True, ignore=shutil.ignore_patterns(".staging_*"))
+    except (OSError, shutil.Error) as e:
+        logger.warning(f"Could not publish {folder}: {e}")
+
+
+def run_chat_job(job: Job, req: ChatRequest) -> dict:
+    if req.document:
+        logger.info("Using provided document for context.")
+        job.publish({"type": "progress", "stage": "generation", "message": "Generating lesson with document context"})
+        inputs = {"messages": [HumanMessage(content=req.query)], "document": req.document}
+    else:
+        logger.info("No document provided, proceeding without context.")
+        job.publish({"type": "progress", "stage": "generation", "message": "Generating lesson"})
+        inputs = {"messages": [HumanMessage(content=req.query)], "document": ""}
+
+    # Node completions and the orchestrator's custom events (markdown_ready, placeholder, ...) are forwarded as they happen
+    for mode, chunk in orchestrator_workflow.stream(inputs, stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            # Media is published before its event, so the URL resolves when the client fetches it
+            if chunk.get("type") == "placeholder":
+                publish_artifacts(chunk.get("files", []))
+            job.publish(chunk)
         else:
-            logger.info("No document provided, proceeding without context.")
-            response = orchestrator_workflow.invoke({"messages": [HumanMessage(content=req.query)], "document": ""})
-                
-        # await run_task(req.query, filepath=f"./artifacts/processed_files/{sanitze_filename(req.query)}/")
+            for node in chunk:
+                job.publish({"type": "node", "node": node})
+            
+    # await run_task(req.query, filepath=f"./artifacts/processed_files/{sanitze_filename(req.query)}/")
 
-        subprocess.run(["cp", "-r", f"./artifacts/processed_files/{sanitze_filename(req.query)}/", "/mnt/2028B41628B3E944/Projects/eduflow-ai/public/artifacts/processed_files/"])
+    job.publish({"type": "progress", "stage": "publish", "message": "Copying artifacts"})
+    publish_folder(f"./artifacts/processed_files/{sanitze_filename(req.query)}")
+    
+    return {"response": f"Generated Successfully!"}
+
+
+def run_audio_job(job: Job, req: AudioRequest) -> dict:
+    initial_state = {
+        "transcript": [],
+        "mode": req.mode,
+        "markdown_document": open(os.path.join("./artifacts/processed_files/", sanitze_filename(req.query), "processed_document.md"), "r", encoding="utf-8").read(),
+        "filepath": os.path.join("./artifacts/processed_files/", sanitze_filename(req.query))
+    }
+    
+    job.publish({"type": "progress", "stage": "generation", "message": f"Generating {req.mode} audio"})
+    audio_agent_worflow = get_audio_workflow()
+    response = audio_agent_worflow.invoke(initial_state)
+
+    job.publish({"type": "progress", "stage": "publish", "message": "Copying artifacts"})
+    publish_folder(f"./artifacts/processed_files/{sanitze_filename(req.query)}/audios")
+
+    logger.info(f"Generated audio response")
+    return {"response": "Audio Generated Successfully!"}
+
+
+def run_video_job(job: Job, req: VideoRequest) -> dict:
+    folder_path = os.path.join(f"./artifacts/processed_files/{sanitze_filename(req.query)}/")
+    #folder_path = os.path.join("/mnt/2028B41628B3E944/Projects/SinisterSixSystem/artifacts/processed_files/Explain_photosynthesis")
+    markdown_path = os.path.join(folder_path, "processed_document.md")
+
+    major_segments = ['']
+
+    with open(markdown_path, 'r', encoding='utf-8') as file:
+        first_sub_heading_found = False
+
+        for raw in file:
+            line = raw.strip()
+            if not line:
+                continue
+            
+            if line.startswith("##"):
+                if first_sub_heading_found:
+                    major_segments.append('')
+                else:
+                    first_sub_heading_found = True
+            
+            if not first_sub_heading_found:
+                continue
+            else:
+                major_segments[-1] += line + "\n"
+
+    for idx, segment in enumerate(major_segments):
+        if idx >=2:
+            break
+        job.publish({"type": "progress", "stage": "generation", "message": f"Rendering video {idx}"})
+        create_video(segment, os.path.join(folder_path, "videos"), idx)
         
-        return {"response": f"Generated Successfully!"}
-    except Exception as e:
-        logger.error(f"Error processing chat request: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+    logger.info(f"Extracted {len(major_segments)} major segments for video generation.")
+    
+    job.publish({"type": "progress", "stage": "publish", "message": "Copying artifacts"})
+    publish_folder(f"./artifacts/processed_files/{sanitze_filename(req.query)}")
+
+    return {"response": "Video Generated Successfully!"}
+
+
+@app.post("/chat")
+async def chat(req: ChatRequest):
+    logger.info(f"Received chat request: {req}")
+    job = job_queue.submit("chat", partial(run_chat_job, req=req), req.model_dump())
+    return {"job_id": job.id, "status": job.status}
 
 
 @app.post("/audio")
 async def audio_chat(req: AudioRequest):
-    try:
-        logger.info(f"Received audio chat request: {req}")
-
-        audio_agent = AudioAgent()
-        initial_state = {
-            "transcript": [],
-            "mode": req.mode,
-            "markdown_document": open(os.path.join("./artifacts/processed_files/", sanitze_filename(req.query), "processed_document.md"), "r", encoding="utf-8").read(),
-            "filepath": os.path.join("./artifacts/processed_files/", sanitze_filename(req.query))
-        }
-        
-        
-        audio_agent_worflow = audio_agent.compile()
-        response = audio_agent_worflow.invoke(initial_state)
+    logger.info(f"Received audio chat request: {req}")
+    job = job_queue.submit("audio", partial(run_audio_job, req=req), req.model_dump())
+    return {"job_id": job.id, "status": job.status}
 
-        subprocess.run(["cp", "-r", f"./artifacts/processed_files/{sanitze_filename(req.query)}/audios", f"/mnt/2028B41628B3E944/Projects/eduflow-ai/public/artifacts/processed_files/{sanitze_filename(req.query)}"])
 
-        logger.info(f"Generated audio response")
-        return {"response": "Audio Generated Successfully!"}
-        
-    except Exception as e:
-        logger.error(f"Error processing audio chat request: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+@app.post("/audio/stream")
+def audio_stream(req: AudioRequest):
+    logger.info(f"Received audio stream request: {req}")
+    markdown_path = os.path.join("./artifacts/processed_files/", sanitze_filename(req.query), "processed_document.md")
+    if not os.path.exists(markdown_path):
+        raise HTTPException(status_code=404, detail="Lesson not generated yet")
 
-@app.post("/video")
-def get_video(req: VideoRequest):
-    try:
-        folder_path = os.path.join(f"./artifacts/processed_files/{sanitze_filename(req.query)}/")
-        #folder_path = os.path.join("/mnt/2028B41628B3E944/Projects/SinisterSixSystem/artifacts/processed_files/Explain_photosynthesis")
-        markdown_path = os.path.join(folder_path, "processed_document.md")
-
-        major_segments = ['']
-
-        with open(markdown_path, 'r', encoding='utf-8') as file:
-            first_sub_heading_found = False
-
-            for raw in file:
-                line = raw.strip()
-                if not line:
-                    continue
-                
-                if line.startswith("##"):
-                    if first_sub_heading_found:
-                        major_segments.append('')
-                    else:
-                        first_sub_heading_found = True
-                
-                if not first_sub_heading_found:
-                    continue
-                else:
-                    major_segments[-1] += line + "\n"
+    with open(markdown_path, "r", encoding="utf-8") as f:
+        transcript = get_audio_agent().build_transcript(req.mode, f.read())
+
+    return StreamingResponse(get_tts().stream_wav(transcript), media_type="audio/wav")
 
-        for idx, segment in enumerate(major_segments):
-            if idx >=2:
+
+@app.post("/video")
+async def get_video(req: VideoRequest):
+    logger.info(f"Received video request: {req}")
+    job = job_queue.submit("video", partial(run_video_job, req=req), req.model_dump())
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        last_seq = -1
+        while True:
+            events = await asyncio.to_thread(job.wait_for_events, last_seq, job_queue.config.keepalive_seconds)
+            if not events:
+                if job.finished:
+                    break
+                yield ": keep-alive\n\n"
+                continue
+
+            for event in events:
+                last_seq = event["seq"]
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+            if job.finished and last_seq == len(job.events) - 1:
                 break
-            create_video(segment, os.path.join(folder_path, "videos"), idx)
-            
-        logger.info(f"Extracted {len(major_segments)} major segments for video generation.")
-        
-        subprocess.run(["cp", "-r", f"./artifacts/processed_files/{sanitze_filename(req.query)}/", "/mnt/2028B41628B3E944/Projects/eduflow-ai/public/artifacts/processed_files/"])
 
-        return {"response": "Video Generated Successfully!"}
-    except Exception as e:
-        logger.error(f"Error processing video request: {e}")
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.get("/models")
+def loaded_models():
+    return registry.loaded()
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Hit rates of the placeholder artifact cache, the graph render cache and the LLM response cache."""
+    return {
+        "artifacts": get_artifact_cache().stats(),
+        "graph_renders": get_graph_render_cache().stats(),
+        "llm": get_llm_response_cache().stats(),
+    }
 
 
 @app.get("/")
@@ -5,8 +5,14 @@ using Large Language Models (Google Gemini API).
 """
 
 import os
+import re
 from typing import Optional
 
+try:
+    from SinisterSixSystems.mermaid_flowchart.mermaid_parser import MermaidSyntaxError, repair_mermaid
+except ImportError:
+    repair_mermaid = None
+
 
 class LLMGraphGenerator:
     """
@@ -138,6 +144,14 @@ Now generate for: {topic}"""
         Returns:
             Fixed Mermaid code string
         """
+        # The flowchart parser repairs bracket shapes and chained arrows in one pass;
+        # the regex rules below only run when it is unavailable or gives up
+        if repair_mermaid is not None:
+            try:
+                return repair_mermaid(code)
+            except MermaidSyntaxError as e:
+                print(f"[WARN] Parser could not repair Mermaid code ({e}), using regex fixes")
+
         lines = code.split("\n")
         fixed_lines = []
         
@@ -152,7 +166,6 @@ Now generate for: {topic}"""
                 continue
             
             # Fix cylindrical shape syntax issues
-            import re
             # Fix [("label")] -> (("label"))
             line = re.sub(r'\[\(\("([^"]+)"\)\)\]', r'(("\1"))', line)
             # Fix [("label")] -> (("label"))
@@ -211,7 +224,6 @@ Now generate for: {topic}"""
             # A --> B --> C should become:
             # A --> B
             # B --> C  
-            import re
             if " --> " in line or "-->" in line:
                 # Check for multiple arrows on one line
                 arrow_count = line.count(" --> ") + line.count("-->")
@@ -0,0 +1,115 @@
+from SinisterSixSystems.logging import logger
+
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import math
+import os
+import re
+import threading
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 inverted index over the chunks of a Chroma collection.
+
+    Chunks are persisted as an append-only JSON-lines log of term frequencies, so
+    adding a batch costs one append and the index is rebuilt by replaying the log on
+    start-up. Searches can be restricted to one source document.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.sources: Dict[str, str] = {}
+        self.total_length = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.lengths
+
+    def _index(self, chunk_id: str, source: str, frequencies: Dict[str, int]) -> None:
+        for term, count in frequencies.items():
+            self.postings.setdefault(term, {})[chunk_id] = count
+        length = sum(frequencies.values())
+        self.lengths[chunk_id] = length
+        self.sources[chunk_id] = source
+        self.total_length += length
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from an interrupted append
+                    continue
+                if entry["id"] not in self.lengths:
+                    self._index(entry["id"], entry["source"], entry["tf"])
+        logger.info(f"Loaded BM25 index with {len(self)} chunks from {self.path}")
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict]) -> int:
+        """
+        Indexes chunks that are not indexed yet and appends them to the log.
+
+        Returns:
+            int: Number of newly indexed chunks.
+        """
+        with self.lock:
+            lines = []
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                if chunk_id in self.lengths:
+                    continue
+                source = (metadata or {}).get("source", "")
+                frequencies = dict(Counter(tokenize(text)))
+                self._index(chunk_id, source, frequencies)
+                lines.append(json.dumps({"id": chunk_id, "source": source, "tf": frequencies}))
+            if lines:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            return len(lines)
+
+    def search(self, query: str, k: int, source: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Returns the `k` best (chunk id, BM25 score) pairs, optionally within one source.
+        """
+        with self.lock:
+            if not self.lengths:
+                return []
+            count = len(self.lengths)
+            average_length = self.total_length / count
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    if source is not None and self.sources[chunk_id] != source:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
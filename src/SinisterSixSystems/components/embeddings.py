@@ -0,0 +1,134 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import RAGConfig
+
+from langchain_core.embeddings import Embeddings
+
+from collections import OrderedDict
+from typing import List, Optional
+import os
+import re
+import threading
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    sentence-transformers model running in-process, so embedding a query costs no
+    network round-trip. Texts are encoded in batches and vectors are L2-normalized.
+    With `local_runtime="onnx"` inference goes through ONNX Runtime, optionally with a
+    quantized export; `num_threads` caps the intra-op threads of either runtime.
+    """
+
+    def __init__(self, config: Optional[RAGConfig] = None):
+        self.config = config or RAGConfig()
+        from sentence_transformers import SentenceTransformer
+
+        kwargs = {"device": self.config.device}
+        if self.config.local_runtime == "onnx":
+            model_kwargs = {"provider": "CPUExecutionProvider"}
+            if self.config.onnx_file_name:
+                model_kwargs["file_name"] = self.config.onnx_file_name
+            if self.config.num_threads:
+                import onnxruntime
+
+                session_options = onnxruntime.SessionOptions()
+                session_options.intra_op_num_threads = self.config.num_threads
+                model_kwargs["session_options"] = session_options
+            kwargs.update(backend="onnx", model_kwargs=model_kwargs)
+        elif self.config.num_threads:
+            import torch
+
+            torch.set_num_threads(self.config.num_threads)
+
+        self.model = SentenceTransformer(self.config.local_model, **kwargs)
+        logger.info(f"Loaded local embedding model {self.config.local_model} ({self.config.local_runtime})")
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.config.encode_batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an embedding backend with an in-memory LRU of query vectors. Follow-up
+    questions about the same document often repeat a query verbatim, and the query
+    embedding sits on the critical path of every document-grounded chat.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_size: int = 1024):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.counters["hits"] += 1
+                return self.cache[key]
+            self.counters["misses"] += 1
+
+        vector = self.embeddings.embed_query(text)
+        with self.lock:
+            self.cache[key] = vector
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {**self.counters, "size": len(self.cache)}
+
+
+def get_embeddings(config: Optional[RAGConfig] = None) -> Embeddings:
+    """
+    Builds the embedding backend selected by `RAGConfig.embedding_backend`.
+    """
+    config = config or RAGConfig()
+    if config.embedding_backend == "local":
+        embeddings = LocalEmbeddings(config)
+    elif config.embedding_backend == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        embeddings = GoogleGenerativeAIEmbeddings(model=config.google_model, api_key=os.getenv("GOOGLE_API_KEY"))
+    else:
+        raise ValueError(f"Unknown embedding backend: {config.embedding_backend}")
+
+    if config.query_cache_size > 0:
+        embeddings = CachedQueryEmbeddings(embeddings, config.query_cache_size)
+    return embeddings
+
+
+def collection_name(config: Optional[RAGConfig] = None) -> str:
+    """
+    Chroma collection for the configured backend. The Gemini backend keeps the
+    original name so existing stores stay readable.
+    """
+    config = config or RAGConfig()
+    if config.embedding_backend == "google":
+        return config.collection_name
+    slug = re.sub(r"[^a-zA-Z0-9_-]+", "-", config.local_model.split("/")[-1]).strip("-").lower()
+    # Chroma names are at most 63 characters and must end with an alphanumeric character
+    return f"{config.collection_name}_{config.embedding_backend}_{slug}"[:63].rstrip("-_")
@@ -0,0 +1,225 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import IngestionConfig
+from SinisterSixSystems.components.bm25 import BM25Index
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from tenacity import Retrying, before_sleep_log, stop_after_attempt, wait_exponential_jitter
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionPipeline:
+    """
+    Streams a PDF into a Chroma collection without re-embedding what is already there.
+
+    Pages are loaded lazily and split one at a time. Every chunk gets a deterministic
+    id (hash of source and text) and a `content_hash` metadata field: chunks whose id
+    is already stored are skipped, and chunks whose text was embedded for another file
+    reuse that embedding. The rest are embedded in batches, a bounded number of
+    requests at a time with exponential backoff, and upserted batch by batch. Progress
+    is saved after every commit, so an interrupted ingestion resumes where it stopped.
+    Committed chunks are also added to the keyword index, when one is given.
+    """
+
+    def __init__(self, vector_store, embedding_model, config: Optional[IngestionConfig] = None, keyword_index: Optional[BM25Index] = None):
+        self.config = config or IngestionConfig()
+        self.keyword_index = keyword_index
+        # langchain_chroma only accepts documents it embeds itself; precomputed embeddings go to the raw collection
+        self.collection = vector_store._collection
+        self.embedding_model = embedding_model
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=self.config.chunk_size, chunk_overlap=self.config.chunk_overlap)
+        self.progress_dir = Path(self.config.progress_dir)
+        self.progress_dir.mkdir(parents=True, exist_ok=True)
+
+    def _progress_path(self, file_path: str, digest: str) -> Path:
+        key = hashlib.sha256(f"{digest}\0{file_path}\0{self.collection.name}".encode("utf-8")).hexdigest()
+        return self.progress_dir / f"{key}.json"
+
+    def _load_progress(self, path: Path) -> dict:
+        signature = f"{self.config.chunk_size}/{self.config.chunk_overlap}"
+        try:
+            with open(path, "r") as f:
+                progress = json.load(f)
+            if progress.get("signature") == signature:
+                return progress
+        except (OSError, ValueError):
+            pass
+        return {"signature": signature, "committed": 0, "complete": False}
+
+    def _progress_is_stored(self, progress: dict) -> bool:
+        """
+        Whether the chunks a progress record claims are still in the collection. Progress
+        lives outside the vector store, which may have been wiped or moved since.
+        """
+        if not progress["committed"]:
+            return True
+        # Records written before `check_id` existed can only be checked for an empty collection
+        if "check_id" not in progress:
+            return self.collection.count() > 0
+        return bool(self.collection.get(ids=[progress["check_id"]], include=[])["ids"])
+
+    @staticmethod
+    def _save_progress(path: Path, progress: dict) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(progress, f)
+        os.replace(tmp_path, path)
+
+    def iter_chunks(self, file_path: str) -> Iterator[Document]:
+        """Yields chunks page by page, so the whole PDF is never held in memory."""
+        for page in PyPDFLoader(file_path).lazy_load():
+            for chunk in self.splitter.split_documents([page]):
+                if chunk.page_content.strip():
+                    yield chunk
+
+    def _batches(self, chunks: Iterator[Document]) -> Iterator[List[Document]]:
+        while True:
+            batch = list(islice(chunks, self.config.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        retrying = Retrying(
+            stop=stop_after_attempt(self.config.max_retries),
+            wait=wait_exponential_jitter(initial=self.config.backoff_initial, max=self.config.backoff_max),
+            before_sleep=before_sleep_log(logger, logging.WARNING),
+            reraise=True,
+        )
+        for attempt in retrying:
+            with attempt:
+                return self.embedding_model.embed_documents(texts)
+
+    def _prepare(self, batch: List[Document]) -> dict:
+        """
+        Resolves one batch to the records that still need to be written (runs in a worker thread).
+        """
+        records = {}
+        for chunk in batch:
+            text_hash = content_hash(chunk.page_content)
+            chunk_id = content_hash(f"{chunk.metadata.get('source', '')}\0{chunk.page_content}")
+            # Repeated text inside one file (headers, footers) collapses to its first occurrence
+            if chunk_id not in records:
+                records[chunk_id] = (chunk, text_hash)
+
+        existing = set(self.collection.get(ids=list(records), include=[])["ids"])
+        pending = {chunk_id: record for chunk_id, record in records.items() if chunk_id not in existing}
+        prepared = {"ids": [], "documents": [], "metadatas": [], "embeddings": [],
+                    "skipped": len(batch) - len(pending), "reused": 0, "embedded": 0,
+                    "existing": [(chunk_id, *records[chunk_id]) for chunk_id in existing]}
+        if not pending:
+            return prepared
+
+        hashes = list({text_hash for _, text_hash in pending.values()})
+        stored = self.collection.get(where={"content_hash": {"$in": hashes}}, include=["embeddings", "metadatas"])
+        known = {}
+        for metadata, embedding in zip(stored["metadatas"], stored["embeddings"]):
+            known.setdefault(metadata["content_hash"], list(embedding))
+
+        missing = [text_hash for text_hash in hashes if text_hash not in known]
+        if missing:
+            texts = {text_hash: chunk.page_content for chunk, text_hash in pending.values()}
+            known.update(zip(missing, self._embed([texts[text_hash] for text_hash in missing])))
+
+        for chunk_id, (chunk, text_hash) in pending.items():
+            prepared["ids"].append(chunk_id)
+            prepared["documents"].append(chunk.page_content)
+            prepared["metadatas"].append({**chunk.metadata, "content_hash": text_hash})
+            prepared["embeddings"].append(known[text_hash])
+        prepared["embedded"] = len(missing)
+        prepared["reused"] = len(pending) - len(missing)
+        return prepared
+
+    def ingest(self, file_path: str) -> dict:
+        """
+        Ingests a PDF, resuming a previous interrupted run of the same file.
+
+        Returns:
+            dict: Chunk counts (`chunks`, `skipped`, `reused`, `embedded`) and `elapsed` seconds.
+        """
+        started = time.monotonic()
+        progress_path = self._progress_path(file_path, file_digest(file_path))
+        progress = self._load_progress(progress_path)
+        stats = {"chunks": 0, "skipped": 0, "reused": 0, "embedded": 0}
+        if not self._progress_is_stored(progress):
+            logger.warning(f"Saved progress of {file_path} does not match the collection, ingesting it again")
+            progress.update(committed=0, complete=False)
+            progress.pop("check_id", None)
+
+        if progress["complete"]:
+            logger.info(f"{file_path} is already ingested, skipping")
+            return {**stats, "elapsed": round(time.monotonic() - started, 3)}
+        if progress["committed"]:
+            logger.info(f"Resuming ingestion of {file_path} after {progress['committed']} chunks")
+
+        # Chunking is deterministic, so committed chunks are skipped without being looked up again
+        chunks = islice(self.iter_chunks(file_path), progress["committed"], None)
+
+        def commit(future: Future, count: int) -> None:
+            prepared = future.result()
+            if prepared["ids"]:
+                self.collection.upsert(
+                    ids=prepared["ids"],
+                    documents=prepared["documents"],
+                    metadatas=prepared["metadatas"],
+                    embeddings=prepared["embeddings"],
+                )
+            if self.keyword_index is not None:
+                # Already-stored chunks are included so a run interrupted between the upsert and this call catches up
+                self.keyword_index.add(
+                    prepared["ids"] + [chunk_id for chunk_id, _, _ in prepared["existing"]],
+                    prepared["documents"] + [chunk.page_content for _, chunk, _ in prepared["existing"]],
+                    prepared["metadatas"] + [chunk.metadata for _, chunk, _ in prepared["existing"]],
+                )
+            committed_ids = prepared["ids"] + [chunk_id for chunk_id, _, _ in prepared["existing"]]
+            if committed_ids:
+                progress["check_id"] = committed_ids[-1]
+            progress["committed"] += count
+            self._save_progress(progress_path, progress)
+            stats["chunks"] += count
+            for counter in ("skipped", "reused", "embedded"):
+                stats[counter] += prepared[counter]
+
+        # Batches are embedded concurrently but committed in order, so progress stays a simple prefix count
+        pool = ThreadPoolExecutor(max_workers=self.config.max_concurrency, thread_name_prefix="ingest")
+        in_flight = deque()
+        try:
+            for batch in self._batches(chunks):
+                in_flight.append((pool.submit(self._prepare, batch), len(batch)))
+                if len(in_flight) >= self.config.max_concurrency:
+                    commit(*in_flight.popleft())
+            while in_flight:
+                commit(*in_flight.popleft())
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        progress["complete"] = True
+        self._save_progress(progress_path, progress)
+
+        stats["elapsed"] = round(time.monotonic() - started, 3)
+        logger.info(f"Ingested {file_path}: {stats}")
+        return stats
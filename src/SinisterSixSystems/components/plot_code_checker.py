@@ -0,0 +1,255 @@
+from SinisterSixSystems.config import PlotCodeCheckConfig
+
+from typing import Dict, List, Optional, Tuple
+import ast
+import builtins
+import hashlib
+import os
+
+
+# Imports added automatically when generated code uses one of these names without importing it
+KNOWN_IMPORTS = {
+    "plt": "import matplotlib.pyplot as plt",
+    "np": "import numpy as np",
+    "matplotlib": "import matplotlib",
+    "mpatches": "import matplotlib.patches as mpatches",
+    "math": "import math",
+    "os": "import os",
+}
+BUILTIN_NAMES = set(dir(builtins)) | {"__name__"}
+
+
+class PlotCodeReport:
+    """
+    Result of a static check: the (possibly auto-fixed) code, the fixes that were
+    applied and the problems that could not be fixed.
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.fixes: List[str] = []
+        self.errors: List[str] = []
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self) -> str:
+        lines = [f"- {error}" for error in self.errors]
+        lines += [f"- fixed: {fix}" for fix in self.fixes]
+        return "\n".join(lines)
+
+
+def _replace_segments(code: str, replacements: List[Tuple[ast.AST, str]]) -> str:
+    """Replaces the source of each node with new text. AST column offsets are UTF-8 byte offsets."""
+    lines = [line.encode("utf-8") for line in code.splitlines(keepends=True)]
+    for node, text in sorted(replacements, key=lambda item: (item[0].lineno, item[0].col_offset), reverse=True):
+        start, end = node.lineno - 1, node.end_lineno - 1
+        head = lines[start][:node.col_offset]
+        tail = lines[end][node.end_col_offset:]
+        lines[start:end + 1] = [head + text.encode("utf-8") + tail]
+    return b"".join(lines).decode("utf-8")
+
+
+def _pyplot_aliases(tree: ast.AST) -> List[str]:
+    aliases = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            aliases += [alias.asname for alias in node.names if alias.name == "matplotlib.pyplot" and alias.asname]
+        elif isinstance(node, ast.ImportFrom) and node.module == "matplotlib":
+            aliases += [alias.asname or alias.name for alias in node.names if alias.name == "pyplot"]
+    return aliases
+
+
+def _string_constants(tree: ast.Module) -> Dict[str, str]:
+    """Module-level `name = "literal"` assignments, used to resolve savefig paths."""
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+    return constants
+
+
+def _resolve_string(node: ast.AST, constants: Dict[str, str]) -> Optional[str]:
+    """Evaluates string literals, known names, f-strings, `+` and os.path.join; None when not static."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        return constants.get(node.id)
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            part = _resolve_string(value.value if isinstance(value, ast.FormattedValue) else value, constants)
+            if part is None:
+                return None
+            parts.append(part)
+        return "".join(parts)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = _resolve_string(node.left, constants), _resolve_string(node.right, constants)
+        return None if left is None or right is None else left + right
+    if isinstance(node, ast.Call) and ast.unparse(node.func) == "os.path.join" and not node.keywords:
+        parts = [_resolve_string(arg, constants) for arg in node.args]
+        return None if None in parts else os.path.join(*parts)
+    return None
+
+
+def _bound_names(tree: ast.AST) -> Optional[set]:
+    """Every name bound anywhere in the module (flow-insensitive); None if a star import makes it unknowable."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.Import):
+            names.update(alias.asname or alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if any(alias.name == "*" for alias in node.names):
+                return None
+            names.update(alias.asname or alias.name for alias in node.names)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+    return names
+
+
+def check_plot_code(code: str, path: str, file_name: str, config: Optional[PlotCodeCheckConfig] = None) -> PlotCodeReport:
+    """
+    Statically checks LLM-generated plotting code before it is executed.
+
+    Checks that the figure is saved to `path`/`file_name`, that only allowed modules
+    are imported, that there is no `show()` call and that every name is defined.
+    Deterministic problems (wrong save path, missing savefig, show() calls, missing
+    common imports) are fixed in `report.code`; the rest are listed in `report.errors`.
+    """
+    config = config or PlotCodeCheckConfig()
+    report = PlotCodeReport(code)
+    expected = os.path.join(path, file_name)
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        report.errors.append(f"line {e.lineno}: syntax error: {e.msg}")
+        return report
+
+    # Imports outside the allow-list cannot be fixed mechanically
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            if module.split(".")[0] not in config.allowed_modules:
+                report.errors.append(f"line {node.lineno}: import of '{module}' is not allowed, use only {', '.join(config.allowed_modules)}")
+
+    if not config.autofix:
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "show":
+                report.errors.append(f"line {node.lineno}: show() must not be called, the figure is saved instead")
+
+    # Lines added at the top, so reported line numbers keep referring to the original code
+    prepended = 0
+
+    # show() would block or warn in a headless worker; the statement is replaced by `pass`
+    show_calls = [
+        node for node in ast.walk(tree)
+        if config.autofix and isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Attribute) and node.value.func.attr == "show"
+    ]
+    if show_calls:
+        code = _replace_segments(code, [(node, "pass") for node in show_calls])
+        report.fixes.append(f"removed {len(show_calls)} show() call(s)")
+        tree = ast.parse(code)
+
+    bound = _bound_names(tree)
+    if bound is not None:
+        undefined = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in bound and node.id not in BUILTIN_NAMES:
+                undefined.setdefault(node.id, node.lineno)
+        missing_imports = []
+        for name, lineno in undefined.items():
+            if config.autofix and name in KNOWN_IMPORTS:
+                missing_imports.append(KNOWN_IMPORTS[name])
+            else:
+                report.errors.append(f"line {lineno}: name '{name}' is not defined")
+        if missing_imports:
+            code = "\n".join(missing_imports) + "\n" + code
+            prepended += len(missing_imports)
+            report.fixes.append(f"added missing imports: {'; '.join(missing_imports)}")
+            tree = ast.parse(code)
+
+    savefig_calls = [
+        node for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "savefig"
+    ]
+    if not savefig_calls:
+        if config.autofix:
+            aliases = _pyplot_aliases(tree)
+            alias = aliases[0] if aliases else "plt"
+            if not aliases:
+                code = KNOWN_IMPORTS["plt"] + "\n" + code
+            code = code.rstrip("\n") + f"\n{alias}.savefig({expected!r}, bbox_inches='tight')\n"
+            report.fixes.append(f"added missing savefig to {expected}")
+        else:
+            report.errors.append(f"the figure is never saved, call savefig({expected!r})")
+    else:
+        constants = _string_constants(tree)
+        replacements = []
+        for call in savefig_calls:
+            target = call.args[0] if call.args else next((kw.value for kw in call.keywords if kw.arg == "fname"), None)
+            if target is None:
+                report.errors.append(f"line {call.lineno - prepended}: savefig() is called without a file name")
+                continue
+            resolved = _resolve_string(target, constants)
+            if resolved is not None and os.path.normpath(resolved) == os.path.normpath(expected):
+                continue
+            if config.autofix:
+                replacements.append((target, repr(expected)))
+                report.fixes.append(f"line {call.lineno - prepended}: savefig path {resolved or ast.unparse(target)!r} -> {expected!r}")
+            else:
+                report.errors.append(f"line {call.lineno - prepended}: savefig must save to {expected!r}")
+        if replacements:
+            code = _replace_segments(code, replacements)
+
+    report.code = code
+    return report
+
+
+class _OutputPathAbstractor(ast.NodeTransformer):
+    def __init__(self, path: str, file_name: str):
+        self.replacements = {
+            os.path.normpath(os.path.join(path, file_name)): "<output>",
+            os.path.normpath(path): "<path>",
+            file_name: "<file_name>",
+        }
+
+    def visit_Constant(self, node: ast.Constant) -> ast.Constant:
+        if isinstance(node.value, str) and node.value:
+            replacement = self.replacements.get(node.value) or self.replacements.get(os.path.normpath(node.value))
+            if replacement:
+                return ast.copy_location(ast.Constant(replacement), node)
+        return node
+
+
+def plot_code_key(code: str, path: str, file_name: str) -> Optional[str]:
+    """
+    Hash of plotting code that ignores formatting, comments and the output location,
+    so near-identical code for different placeholders maps to the same render.
+
+    Returns:
+        str | None: Hex digest, or None if the code does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    tree = _OutputPathAbstractor(path, file_name).visit(tree)
+    return hashlib.sha256(ast.dump(tree).encode("utf-8")).hexdigest()
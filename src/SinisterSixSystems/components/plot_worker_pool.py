@@ -0,0 +1,264 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import PlotCodeCheckConfig, PlotWorkerPoolConfig
+
+import multiprocessing
+import threading
+import queue
+import time
+from typing import List, Optional
+
+
+# Builtins generated plotting code has no business calling
+BLOCKED_BUILTINS = ("open", "eval", "exec", "compile", "input", "breakpoint", "exit", "quit", "help", "memoryview", "globals", "vars")
+
+
+def _sandboxed_builtins(allowed_modules: List[str]) -> dict:
+    """Builtins for generated code: the blocked ones removed and imports limited to `allowed_modules`."""
+    import builtins
+
+    def guarded_import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name.split(".")[0] not in allowed_modules:
+            raise ImportError(f"import of '{name}' is not allowed in plotting code")
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    sandboxed = {name: value for name, value in vars(builtins).items() if name not in BLOCKED_BUILTINS}
+    sandboxed["__import__"] = guarded_import
+    return sandboxed
+
+
+def _reset_matplotlib(matplotlib, plt) -> None:
+    """Undoes what a job changed globally, so its output never depends on earlier jobs."""
+    plt.close("all")
+    matplotlib.rcdefaults()
+    plt.style.use("default")
+    if matplotlib.get_backend().lower() != "agg":
+        plt.switch_backend("Agg")
+
+
+def _worker_main(conn, memory_limit: Optional[int], allowed_modules: List[str]) -> None:
+    """
+    Entry point of a plotting worker. Imports matplotlib once and then executes
+    every code string received over the pipe in a fresh global namespace, with
+    restricted builtins and imports.
+    """
+    import contextlib
+    import io
+    import os
+    import traceback
+
+    # BLAS thread pools reserve address space per thread, which would eat into the memory limit
+    for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, "1")
+
+    if memory_limit:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy  # noqa: F401  (pre-imported so generated code does not pay for it)
+
+    sandboxed_builtins = _sandboxed_builtins(allowed_modules)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if message is None:
+            break
+
+        output = io.StringIO()
+        status, detail = "ok", ""
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                exec(compile(message, "<generated_code>", "exec"), {"__name__": "__main__", "__builtins__": dict(sandboxed_builtins)})
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                status, detail = "error", f"SystemExit: {e.code}"
+        except BaseException:
+            status, detail = "error", traceback.format_exc()
+        finally:
+            try:
+                _reset_matplotlib(matplotlib, plt)
+            except Exception:
+                # A worker that cannot be reset must not run another job
+                conn.send(("error", traceback.format_exc()))
+                break
+
+        conn.send((status, detail))
+
+    conn.close()
+
+
+class _PlotWorker:
+    def __init__(self, context, memory_limit: Optional[int], allowed_modules: List[str]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit, allowed_modules), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class PlotWorkerPool:
+    """
+    Pool of long-lived python processes with matplotlib (Agg backend) pre-imported.
+
+    Generated plotting code is sent to an idle worker over a pipe instead of
+    launching a fresh interpreter per attempt. Workers are recycled after
+    `max_jobs_per_worker` jobs, on timeout and on crash. Each worker runs under an
+    address-space limit, generated code only gets restricted builtins and the
+    modules allowed by PlotCodeCheckConfig, and matplotlib's global state is reset
+    after every job.
+    """
+
+    def __init__(self, config: Optional[PlotWorkerPoolConfig] = None):
+        self.config = config or PlotWorkerPoolConfig()
+        self.allowed_modules = list(PlotCodeCheckConfig().allowed_modules)
+        # Spawned (not forked) because the pool is used from server threads.
+        self.context = multiprocessing.get_context("spawn")
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.spawn_lock = threading.Lock()
+        self.workers = set()
+        self.closed = False
+
+        for _ in range(self.config.pool_size):
+            self._add_worker()
+
+    @property
+    def size(self) -> int:
+        with self.lock:
+            return len(self.workers)
+
+    def _spawn(self) -> _PlotWorker:
+        for attempt in range(1, self.config.respawn_attempts + 1):
+            try:
+                return _PlotWorker(self.context, self.config.memory_limit, self.allowed_modules)
+            except Exception as e:
+                logger.warning(f"Could not start plot worker (attempt {attempt}/{self.config.respawn_attempts}): {e!r}")
+                time.sleep(0.5 * attempt)
+        raise RuntimeError("Could not start a plot worker")
+
+    def _add_worker(self) -> None:
+        worker = self._spawn()
+        with self.lock:
+            self.workers.add(worker)
+        self.idle.put(worker)
+
+    def _retire(self, worker: _PlotWorker, graceful: bool = True) -> None:
+        with self.lock:
+            self.workers.discard(worker)
+        if graceful:
+            worker.stop()
+        else:
+            worker.kill()
+        if self.closed:
+            return
+        try:
+            self._add_worker()
+        except RuntimeError as e:
+            # The pool runs short; the next execute() tries to top it up again
+            logger.error(f"Plot worker pool shrank to {self.size}: {e}")
+
+    def _acquire(self) -> _PlotWorker:
+        """Takes an idle worker, replacing lost ones; fails instead of waiting on an empty pool."""
+        while True:
+            if self.closed:
+                raise RuntimeError("Plot worker pool is closed")
+            with self.spawn_lock:
+                if self.idle.empty() and self.size < self.config.pool_size:
+                    try:
+                        self._add_worker()
+                    except RuntimeError:
+                        if self.size == 0:
+                            raise
+            try:
+                return self.idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def execute(self, python_code: str, timeout: Optional[float] = None) -> None:
+        """
+        Executes python code in a warm worker.
+
+        Args:
+            python_code: The Python code string to execute
+            timeout: Seconds to wait for the worker, defaults to the configured timeout
+
+        Raises:
+            TimeoutError: If the code does not finish in time
+            RuntimeError: If code execution fails or the worker crashes
+        """
+        timeout = timeout or self.config.timeout
+        worker = self._acquire()
+
+        try:
+            worker.conn.send(python_code)
+            finished = worker.conn.poll(timeout)
+            if finished:
+                status, detail = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            logger.error(f"Plot worker crashed: {e!r}")
+            self._retire(worker, graceful=False)
+            raise RuntimeError(f"Code execution failed:\nWorker process crashed ({e!r})")
+
+        if not finished:
+            logger.error(f"Plot worker timed out after {timeout}s, recycling it")
+            self._retire(worker, graceful=False)
+            raise TimeoutError(f"Code execution timed out after {timeout} seconds")
+
+        worker.jobs += 1
+        if worker.jobs >= self.config.max_jobs_per_worker or self.closed:
+            self._retire(worker)
+        else:
+            self.idle.put(worker)
+
+        if status != "ok":
+            raise RuntimeError(f"Code execution failed:\n{detail}")
+
+    def close(self) -> None:
+        self.closed = True
+        idle = set()
+        while not self.idle.empty():
+            idle.add(self.idle.get_nowait())
+        with self.lock:
+            workers, self.workers = self.workers, set()
+        for worker in workers:
+            # Busy workers are killed as well, their callers get a crash error
+            if worker in idle:
+                worker.stop()
+            else:
+                worker.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_plot_worker_pool() -> PlotWorkerPool:
+    """Returns the process-wide plotting worker pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PlotWorkerPool()
+    return _pool
@@ -1,7 +1,13 @@
 from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from SinisterSixSystems.components.embeddings import collection_name, get_embeddings
+from SinisterSixSystems.components.bm25 import BM25Index
+from SinisterSixSystems.components.ingestion import IngestionPipeline
+from SinisterSixSystems.components.retrieval import HybridRetriever
+from SinisterSixSystems.components.shards import ShardManager
+from SinisterSixSystems.config import RAGConfig
+from SinisterSixSystems.logging import logger
+from langchain_core.documents import Document
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
 import os
 
@@ -12,29 +18,107 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 
 class RAG:
-    def __init__(self, persist_directory: str = "./chroma_db"):
-        self.persist_directory = persist_directory
-        self.embedding_model = GoogleGenerativeAIEmbeddings(model="gemini-embedding-001", api_key=GOOGLE_API_KEY)
+    def __init__(self, persist_directory: Optional[str] = None, config: Optional[RAGConfig] = None):
+        self.config = config or RAGConfig()
+        self.persist_directory = persist_directory or self.config.persist_directory
+        self.embedding_model = get_embeddings(self.config)
         self.vector_store = Chroma(
             persist_directory=self.persist_directory,
             embedding_function=self.embedding_model,
-            collection_name="sinister_six_systems",
+            collection_name=collection_name(self.config),
         )
+        self.keyword_index = BM25Index(
+            os.path.join(self.persist_directory, f"bm25_{collection_name(self.config)}.jsonl"),
+            k1=self.config.bm25_k1,
+            b=self.config.bm25_b,
+        )
+        if self.config.hybrid_enabled:
+            self._backfill_keyword_index()
+        self.retriever = HybridRetriever(self.vector_store, self.keyword_index, self.config)
+        self.shards = ShardManager(self.persist_directory, self.embedding_model, collection_name(self.config), self.config)
+        if self.config.partition_by_document:
+            self._backfill_shared_collection()
+
+    def _backfill_keyword_index(self, page_size: int = 1000):
+        """Indexes chunks that were stored before the keyword index existed."""
+        stored = self.vector_store._collection.count()
+        if len(self.keyword_index) >= stored:
+            return
+        added = 0
+        for offset in range(0, stored, page_size):
+            page = self.vector_store.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            added += self.keyword_index.add(page["ids"], page["documents"], page["metadatas"])
+        logger.info(f"Backfilled BM25 index with {added} chunks")
+
+    def _backfill_shared_collection(self):
+        """Copies shards ingested before they were mirrored into the shared collection."""
+        for source in self.shards.sources():
+            if not self.shards.catalog.get(source).get("mirrored"):
+                self._mirror_shard(source, self.shards.get(source))
+
+    def _mirror_shard(self, source: str, shard, page_size: int = 1000):
+        """
+        Copies a shard's chunks, with their embeddings, into the shared collection and
+        keyword index, which serve unscoped queries. Chunk ids are deterministic, so
+        chunks the shared collection already holds are skipped.
+        """
+        stored = shard.vector_store._collection.count()
+        copied = 0
+        for offset in range(0, stored, page_size):
+            page = shard.vector_store._collection.get(limit=page_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+            existing = set(self.vector_store._collection.get(ids=page["ids"], include=[])["ids"])
+            missing = [i for i, chunk_id in enumerate(page["ids"]) if chunk_id not in existing]
+            if missing:
+                self.vector_store._collection.upsert(
+                    ids=[page["ids"][i] for i in missing],
+                    documents=[page["documents"][i] for i in missing],
+                    metadatas=[page["metadatas"][i] for i in missing],
+                    embeddings=[list(page["embeddings"][i]) for i in missing],
+                )
+                copied += len(missing)
+            # Indexed separately, so a copy interrupted between the upsert and this call catches up
+            self.keyword_index.add(page["ids"], page["documents"], page["metadatas"])
+        self.shards.catalog.register(source, shard.collection_name, mirrored=True)
+        logger.info(f"Copied {copied} chunks of {source} into the shared collection")
 
     def add_documents(self, documents):
-        self.vector_store.add_documents(documents)
+        ids = self.vector_store.add_documents(documents)
+        self.keyword_index.add(ids, [doc.page_content for doc in documents], [doc.metadata for doc in documents])
 
     def process_file(self, file_path: str):
-        loader = PyPDFLoader(file_path)
-        documents = loader.load_and_split(text_splitter=RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200))
-        self.add_documents(documents)
+        if not self.config.partition_by_document:
+            return IngestionPipeline(self.vector_store, self.embedding_model, keyword_index=self.keyword_index).ingest(file_path)
+
+        shard = self.shards.get_or_create(file_path)
+        # Cleared first, so a copy cut short by a crash is redone on the next start
+        self.shards.catalog.register(file_path, shard.collection_name, mirrored=False)
+        stats = IngestionPipeline(shard.vector_store, self.embedding_model, keyword_index=shard.keyword_index).ingest(file_path)
+        self.shards.catalog.register(file_path, shard.collection_name, chunks=shard.vector_store._collection.count())
+        # Chunks are copied with their embeddings, so nothing is embedded twice
+        self._mirror_shard(file_path, shard)
+        return stats
+
+    def _retriever(self, filename: Optional[str]) -> Tuple[HybridRetriever, Optional[str]]:
+        """The retriever a query searches, with the source filter it needs."""
+        if self.config.partition_by_document and filename:
+            shard = self.shards.get(filename)
+            # Documents ingested before partitioning only live in the shared collection
+            if shard is not None:
+                return shard.retriever, None
+        # The shared collection holds every document, so unscoped queries never open a shard
+        return self.retriever, filename
 
     def query(self, query_text: str, k: int = 4, filename: str = None):
-        
-        if filename:
-            results = self.vector_store.similarity_search_with_score(
-                query_text, k=k, filter={"source": filename}
-            )
-        else:
-            results = self.vector_store.similarity_search_with_score(query_text, k=k)
-        return results
\ No newline at end of file
+        """
+        Hybrid (vector + BM25) retrieval, optionally reranked. A query scoped to a
+        document only searches that document's shard; unscoped queries search the
+        shared collection.
+
+        Returns:
+            list[tuple[Document, float]]: Best chunks first, with their fused or reranker score.
+        """
+        retriever, source = self._retriever(filename)
+        return retriever.retrieve(query_text, k=k or self.config.retrieval_k, filename=source)
+
+    def retrieve_documents(self, query: str, filename: str = None, k: Optional[int] = None) -> List[Document]:
+        return [doc for doc, _ in self.query(query, k=k, filename=filename)]
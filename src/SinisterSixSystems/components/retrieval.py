@@ -0,0 +1,101 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import RAGConfig
+from SinisterSixSystems.components.bm25 import BM25Index
+
+from langchain_core.documents import Document
+
+from typing import Dict, List, Optional, Tuple
+import threading
+import time
+
+
+class HybridRetriever:
+    """
+    Retrieves chunks by fusing vector similarity with BM25 keyword matching.
+
+    Both retrievers return `candidate_k` chunks, which are merged with reciprocal
+    rank fusion (score = sum of 1 / (rrf_k + rank)). When enabled, a local
+    cross-encoder re-scores the best fused candidates before the top `k` are kept.
+    The duration of every stage is logged and kept in `last_timings`.
+    """
+
+    def __init__(self, vector_store, keyword_index: BM25Index, config: Optional[RAGConfig] = None):
+        self.config = config or RAGConfig()
+        self.vector_store = vector_store
+        self.keyword_index = keyword_index
+        self.reranker = None
+        self.reranker_lock = threading.Lock()
+        self.last_timings: Dict[str, float] = {}
+
+    def _get_reranker(self):
+        with self.reranker_lock:
+            if self.reranker is None:
+                from sentence_transformers import CrossEncoder
+
+                self.reranker = CrossEncoder(self.config.reranker_model, device=self.config.device)
+                logger.info(f"Loaded reranker {self.config.reranker_model}")
+        return self.reranker
+
+    def _vector_candidates(self, query: str, filename: Optional[str]) -> List[Tuple[str, Document]]:
+        results = self.vector_store.similarity_search_with_score(
+            query, k=self.config.candidate_k, filter={"source": filename} if filename else None
+        )
+        return [(doc.id, doc) for doc, _ in results]
+
+    def _keyword_candidates(self, query: str, filename: Optional[str]) -> List[Tuple[str, Document]]:
+        hits = self.keyword_index.search(query, self.config.candidate_k, source=filename)
+        if not hits:
+            return []
+        stored = self.vector_store.get(ids=[chunk_id for chunk_id, _ in hits], include=["documents", "metadatas"])
+        documents = {
+            chunk_id: Document(id=chunk_id, page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        }
+        return [(chunk_id, documents[chunk_id]) for chunk_id, _ in hits if chunk_id in documents]
+
+    def _fuse(self, rankings: List[List[Tuple[str, Document]]]) -> List[Tuple[Document, float]]:
+        scores: Dict[str, float] = {}
+        documents: Dict[str, Document] = {}
+        for ranking in rankings:
+            for rank, (chunk_id, doc) in enumerate(ranking, start=1):
+                # Chunks ingested before ids were deterministic are told apart by their text
+                key = chunk_id or doc.page_content
+                scores[key] = scores.get(key, 0.0) + 1.0 / (self.config.rrf_k + rank)
+                documents.setdefault(key, doc)
+        return sorted(((documents[key], score) for key, score in scores.items()), key=lambda item: item[1], reverse=True)
+
+    def _rerank(self, query: str, candidates: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+        head = candidates[:self.config.rerank_candidates]
+        scores = self._get_reranker().predict([(query, doc.page_content) for doc, _ in head])
+        reranked = sorted(zip((doc for doc, _ in head), (float(score) for score in scores)), key=lambda item: item[1], reverse=True)
+        return reranked + candidates[self.config.rerank_candidates:]
+
+    def retrieve(self, query: str, k: Optional[int] = None, filename: Optional[str] = None) -> List[Tuple[Document, float]]:
+        """
+        Returns the top `k` (document, score) pairs, best first. Scores are fused RRF
+        scores, or cross-encoder scores when reranking is enabled.
+        """
+        k = k or self.config.retrieval_k
+        timings = {}
+
+        started = time.perf_counter()
+        rankings = [self._vector_candidates(query, filename)]
+        timings["vector"] = time.perf_counter() - started
+
+        if self.config.hybrid_enabled:
+            started = time.perf_counter()
+            rankings.append(self._keyword_candidates(query, filename))
+            timings["bm25"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        candidates = self._fuse(rankings)
+        timings["fusion"] = time.perf_counter() - started
+
+        if self.config.reranker_enabled and len(candidates) > 1:
+            started = time.perf_counter()
+            candidates = self._rerank(query, candidates)
+            timings["rerank"] = time.perf_counter() - started
+
+        self.last_timings = {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()}
+        logger.info(f"Retrieved {min(k, len(candidates))} of {len(candidates)} candidates in ms: {self.last_timings}")
+        return candidates[:k]
@@ -0,0 +1,134 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import RAGConfig
+from SinisterSixSystems.components.bm25 import BM25Index
+from SinisterSixSystems.components.retrieval import HybridRetriever
+
+from langchain_chroma import Chroma
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class Shard:
+    """One document's Chroma collection with its keyword index and retriever."""
+
+    def __init__(self, source: str, collection_name: str, persist_directory: str, embedding_model, config: RAGConfig):
+        self.source = source
+        self.collection_name = collection_name
+        self.vector_store = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embedding_model,
+            collection_name=collection_name,
+        )
+        self.keyword_index = BM25Index(
+            os.path.join(persist_directory, "bm25", f"{collection_name}.jsonl"),
+            k1=config.bm25_k1,
+            b=config.bm25_b,
+        )
+        self.retriever = HybridRetriever(self.vector_store, self.keyword_index, config)
+
+
+class ShardCatalog:
+    """
+    JSON map of source document -> shard collection, so a query can find its shard
+    without listing or opening any collection.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read shard catalog {self.path}: {e}")
+
+    def get(self, source: str) -> Optional[dict]:
+        with self.lock:
+            return self.entries.get(source)
+
+    def sources(self) -> List[str]:
+        with self.lock:
+            return list(self.entries)
+
+    def register(self, source: str, collection_name: str, **fields) -> None:
+        with self.lock:
+            entry = self.entries.setdefault(source, {"collection": collection_name, "created_at": time.time()})
+            entry.update(fields, updated_at=time.time())
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class ShardManager:
+    """
+    Per-document partitions of the vector store.
+
+    Every ingested document gets its own collection, so a document-scoped query only
+    searches that document's chunks. Shards are opened on first use and at most
+    `max_open_shards` stay open; the least recently queried one is dropped (with its
+    in-memory keyword index) when another one is opened.
+    """
+
+    def __init__(self, persist_directory: str, embedding_model, base_name: str, config: Optional[RAGConfig] = None):
+        self.config = config or RAGConfig()
+        self.persist_directory = persist_directory
+        self.embedding_model = embedding_model
+        self.base_name = base_name
+        self.catalog = ShardCatalog(os.path.join(persist_directory, f"catalog_{base_name}.json"))
+        self.open_shards = OrderedDict()
+        self.lock = threading.Lock()
+
+    def collection_name(self, source: str) -> str:
+        digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        # Chroma names are at most 63 characters
+        return f"{self.base_name[:40]}_doc_{digest}"
+
+    def _open(self, source: str, collection_name: str) -> Shard:
+        with self.lock:
+            shard = self.open_shards.get(source)
+            if shard is not None:
+                self.open_shards.move_to_end(source)
+                return shard
+
+        started = time.perf_counter()
+        shard = Shard(source, collection_name, self.persist_directory, self.embedding_model, self.config)
+        logger.info(f"Opened shard {collection_name} for {source} in {round((time.perf_counter() - started) * 1000, 2)} ms")
+
+        with self.lock:
+            # Another thread may have opened it meanwhile; keep the first one
+            shard = self.open_shards.setdefault(source, shard)
+            self.open_shards.move_to_end(source)
+            while len(self.open_shards) > self.config.max_open_shards:
+                evicted, _ = self.open_shards.popitem(last=False)
+                logger.info(f"Evicted cold shard for {evicted}")
+        return shard
+
+    def get(self, source: str) -> Optional[Shard]:
+        """Returns the shard of an ingested document, or None if it has none."""
+        entry = self.catalog.get(source)
+        if entry is None:
+            return None
+        return self._open(source, entry["collection"])
+
+    def get_or_create(self, source: str) -> Shard:
+        entry = self.catalog.get(source)
+        collection_name = entry["collection"] if entry else self.collection_name(source)
+        shard = self._open(source, collection_name)
+        if entry is None:
+            self.catalog.register(source, collection_name)
+        return shard
+
+    def sources(self) -> List[str]:
+        return self.catalog.sources()
@@ -1,78 +1,295 @@
 from SinisterSixSystems.logging import logger
 from SinisterSixSystems.config import TTSConfig
 from pocket_tts import TTSModel
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
 import numpy as np
+import hashlib
+import multiprocessing
 import os
+import struct
+import threading
 
 import torch
 import scipy.io.wavfile
+import soundfile
+
+
+VOICE_CLONING_ERROR = "We could not download the weights for the model with voice cloning"
 
 
 class TTS:
-    def __init__(self) -> None:
-        self.model = TTSModel.load_model()
+    def __init__(self, in_process: bool = False) -> None:
         self.config = TTSConfig()
+        # With a worker pool every line is synthesized by the workers' own models, so the
+        # parent never loads one; `in_process` forces local synthesis (used by the workers)
+        self.parallel = self.config.parallel_workers > 1 and not in_process
+        self._model = None
+        self._sample_rate = None
+        # The model instance is shared process-wide, synthesis calls must not interleave
+        self.lock = threading.Lock()
+        self.model_lock = threading.Lock()
+        self.voice_states = OrderedDict()
+        self.pool = None
+        self.pool_lock = threading.Lock()
 
-    def generate_audio(self, text: str, voice: str) -> None:
-        try:
-            voice_state = self.model.get_state_for_audio_prompt(voice)
-            audio = self.model.generate_audio(voice_state, text, frames_after_eos=2)
-        except Exception as e:
-            logger.warning(f"Error generating audio: {e}")
-            if "We could not download the weights for the model with voice cloning" in str(e):
-                logger.warning("Voice cloning is not available, using default voice")
-                audio = self.model.generate_audio("alba", text)
+    @property
+    def model(self) -> TTSModel:
+        with self.model_lock:
+            if self._model is None:
+                self._model = TTSModel.load_model()
+            return self._model
+
+    @property
+    def sample_rate(self) -> int:
+        if self._sample_rate is None:
+            if self.parallel:
+                self._sample_rate = self._run_in_pool(_worker_sample_rate)
             else:
-                raise e
+                self._sample_rate = self.model.sample_rate
+        return self._sample_rate
 
-        scipy.io.wavfile.write(self.config.default_audio_path, self.model.sample_rate, audio.numpy())
+    def _voice_state_path(self, voice: str) -> Optional[str]:
+        if not self.config.voice_state_cache_dir:
+            return None
+        key = voice
+        if os.path.isfile(voice):
+            # Local prompt files are keyed by content version as well as path
+            key = f"{voice}:{os.path.getmtime(voice)}"
+        return os.path.join(self.config.voice_state_cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".pt")
 
-    def generate_batch_audio(self, conversations: list[dict[str, str]], folderpath: str, mode: str) -> None:
-        audios = []
-        silence_duration_seconds = np.random.uniform(0.1, 0.3)
+    def get_voice_state(self, voice: str):
+        """
+        Returns the encoded state for a voice prompt, computing it at most once.
+
+        States are looked up in memory first, then on disk, and only then
+        encoded by the model. The in-memory cache evicts least recently used voices.
+        """
+        if voice in self.voice_states:
+            self.voice_states.move_to_end(voice)
+            return self.voice_states[voice]
+
+        path = self._voice_state_path(voice)
+        voice_state = None
+        if path and os.path.exists(path):
+            try:
+                voice_state = torch.load(path, weights_only=False)
+            except Exception as e:
+                logger.warning(f"Could not load cached voice state for {voice}: {e}")
+
+        if voice_state is None:
+            voice_state = self.model.get_state_for_audio_prompt(voice)
+            if path:
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    torch.save(voice_state, tmp_path)
+                    os.replace(tmp_path, path)
+                except Exception as e:
+                    logger.warning(f"Could not serialize voice state for {voice}: {e}")
+
+        self.voice_states[voice] = voice_state
+        while len(self.voice_states) > self.config.voice_state_cache_size:
+            self.voice_states.popitem(last=False)
+        return voice_state
+
+    def warm_up(self, voices: Optional[list[str]] = None) -> None:
+        """Encodes the configured voices ahead of the first request."""
+        if self.parallel:
+            # Starts the workers, which load the model and encode the voices in their initializer
+            logger.info(f"TTS workers ready, sample rate {self.sample_rate}")
+            return
+        with self.lock:
+            for voice in voices or self.config.preload_voices:
+                try:
+                    self.get_voice_state(voice)
+                    logger.info(f"Voice state ready: {voice}")
+                except Exception as e:
+                    logger.warning(f"Could not preload voice {voice}: {e}")
+
+    def _synthesize(self, voice: str, text: str) -> torch.Tensor:
         try:
-            for conversation in conversations:
-                voice, text = conversation["voice"], conversation["text"]
-                voice_state = self.model.get_state_for_audio_prompt(voice)
-                audio = self.model.generate_audio(voice_state, text, frames_after_eos=2)
-                audios.append(audio)
+            voice_state = self.get_voice_state(voice)
+            return self.model.generate_audio(voice_state, text, frames_after_eos=2)
         except Exception as e:
-            logger.error(f"Error generating batch audio: {e}")
-            if "We could not download the weights for the model with voice cloning" in str(e):
+            if VOICE_CLONING_ERROR in str(e) and voice != "alba":
                 logger.warning("Voice cloning is not available, using default voice")
-                for conversation in conversations:
-                    voice, text = conversation["voice"], conversation["text"]
-                    voice_state = self.model.get_state_for_audio_prompt("alba")
-                    audio = self.model.generate_audio(voice_state, text, frames_after_eos=2)
-                    audios.append(audio)
-            else:
-                raise e
-
-        # Prepare silence tensor
-        sample_rate = self.model.sample_rate
-        # Check if audio is 1D or 2D
-        audio_shape = audios[0].shape
-        if len(audio_shape) == 1:
-            # 1D audio: (num_samples,)
-            silence_samples = int(silence_duration_seconds * sample_rate)
-            silence = torch.zeros(silence_samples, dtype=audios[0].dtype, device=audios[0].device)
-            concat_dim = 0
+                voice_state = self.get_voice_state("alba")
+                return self.model.generate_audio(voice_state, text, frames_after_eos=2)
+            logger.error(f"Error generating audio: {e}")
+            raise e
+
+    def generate_audio(self, text: str, voice: str) -> None:
+        if self.parallel:
+            audio = self._run_in_pool(_synthesize_in_worker, voice, text)
         else:
-            # 2D audio: (num_channels, num_samples)
-            num_channels = audio_shape[0]
-            silence_samples = int(silence_duration_seconds * sample_rate)
-            silence = torch.zeros((num_channels, silence_samples), dtype=audios[0].dtype, device=audios[0].device)
-            concat_dim = 1
-
-        # Interleave silence between audios
-        merged_audio = []
-        for idx, audio in enumerate(audios):
-            merged_audio.append(audio)
-            # Don't add silence after the last segment
-            if idx < len(audios) - 1:
-                merged_audio.append(silence)
-
-        final_audio = torch.cat(merged_audio, dim=concat_dim)
+            with self.lock:
+                audio = self._to_frames(self._synthesize(voice, text))
+
+        scipy.io.wavfile.write(self.config.default_audio_path, self.sample_rate, audio)
+
+    @staticmethod
+    def _to_frames(audio: torch.Tensor) -> np.ndarray:
+        # 2D audio is (num_channels, num_samples); file writers expect frames first
+        segment = audio.cpu().numpy().astype(np.float32)
+        if segment.ndim == 2:
+            segment = segment.T
+        return segment
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.pool_lock:
+            if self.pool is None:
+                logger.info(f"Starting {self.config.parallel_workers} TTS workers with {self.config.threads_per_worker} threads each")
+                self.pool = ProcessPoolExecutor(
+                    max_workers=self.config.parallel_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_synthesis_worker,
+                    initargs=(self.config.threads_per_worker,),
+                )
+            return self.pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Drops a broken pool so the next request starts fresh workers."""
+        with self.pool_lock:
+            if self.pool is pool:
+                self.pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run_in_pool(self, fn, *args):
+        pool = self._get_pool()
+        try:
+            return pool.submit(fn, *args).result()
+        except BrokenProcessPool:
+            logger.error("A TTS worker died, restarting the worker pool")
+            self._reset_pool(pool)
+            raise
 
+    def _iter_parallel(self, conversations: list[dict[str, str]]) -> Iterator[np.ndarray]:
+        """
+        Shards transcript lines across the worker pool and yields them in transcript order.
+        Only a bounded window of lines is in flight, so memory stays proportional to the pool size.
+        """
+        pool = self._get_pool()
+        window = self.config.parallel_workers * self.config.parallel_prefetch
+        pending = deque()
+        lines = iter(conversations)
+
+        try:
+            for conversation in lines:
+                pending.append(pool.submit(_synthesize_in_worker, conversation["voice"], conversation["text"]))
+                if len(pending) >= window:
+                    break
+
+            while pending:
+                segment = pending.popleft().result()
+                next_line = next(lines, None)
+                if next_line is not None:
+                    pending.append(pool.submit(_synthesize_in_worker, next_line["voice"], next_line["text"]))
+                yield segment
+        except BrokenProcessPool:
+            # A crashed worker (e.g. OOM) breaks the whole pool; rebuild it for later requests
+            logger.error("A TTS worker died, restarting the worker pool")
+            self._reset_pool(pool)
+            raise
+        finally:
+            # Also runs when a streaming client disconnects and the generator is closed
+            for future in pending:
+                future.cancel()
+
+    def _iter_sequential(self, conversations: list[dict[str, str]]) -> Iterator[np.ndarray]:
+        for conversation in conversations:
+            # Locked per line only, so a slow consumer of this generator does not block other requests
+            with self.lock:
+                audio = self._synthesize(conversation["voice"], conversation["text"])
+            yield self._to_frames(audio)
+
+    def iter_segments(self, conversations: list[dict[str, str]]) -> Iterator[np.ndarray]:
+        """
+        Synthesizes the transcript one line at a time.
+
+        Yields every segment as a float32 array shaped (num_samples,) or
+        (num_samples, num_channels), with a silence gap between segments, so at
+        most one segment is held in memory. Lines are synthesized on the worker
+        pool when `parallel_workers` is greater than one.
+        """
+        silence_duration_seconds = np.random.uniform(*self.config.silence_range)
+        silence_samples = int(silence_duration_seconds * self.sample_rate)
+
+        if self.parallel:
+            segments = self._iter_parallel(conversations)
+        else:
+            segments = self._iter_sequential(conversations)
+
+        for idx, segment in enumerate(segments):
+            if idx > 0:
+                yield np.zeros((silence_samples,) + segment.shape[1:], dtype=np.float32)
+            yield segment
+
+    def generate_batch_audio(self, conversations: list[dict[str, str]], folderpath: str, mode: str) -> None:
+        """
+        Synthesizes the transcript into `<folderpath>/audios/<mode>.wav`, writing each
+        segment to the file as soon as it is generated.
+        """
         os.makedirs(os.path.join(folderpath, "audios"), exist_ok=True)
-        scipy.io.wavfile.write(os.path.join(folderpath, f"audios/{mode}.wav"), sample_rate, final_audio.cpu().numpy())
\ No newline at end of file
+        output_path = os.path.join(folderpath, f"audios/{mode}.wav")
+
+        audio_file = None
+        try:
+            for segment in self.iter_segments(conversations):
+                if audio_file is None:
+                    channels = 1 if segment.ndim == 1 else segment.shape[1]
+                    audio_file = soundfile.SoundFile(output_path, "w", samplerate=self.sample_rate, channels=channels, subtype="FLOAT")
+                audio_file.write(segment)
+        finally:
+            if audio_file is not None:
+                audio_file.close()
+
+    def _wav_header(self, channels: int) -> bytes:
+        """16-bit PCM WAV header with open-ended sizes, for responses of unknown length."""
+        sample_rate = self.sample_rate
+        unknown_size = 0xFFFFFFFF
+        return (
+            b"RIFF" + struct.pack("<I", unknown_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, sample_rate * channels * 2, channels * 2, 16)
+            + b"data" + struct.pack("<I", unknown_size)
+        )
+
+    def stream_wav(self, conversations: list[dict[str, str]]) -> Iterator[bytes]:
+        """
+        Yields a 16-bit PCM WAV stream segment by segment, suitable for an HTTP streaming response.
+        """
+        header_sent = False
+        for segment in self.iter_segments(conversations):
+            if not header_sent:
+                yield self._wav_header(1 if segment.ndim == 1 else segment.shape[1])
+                header_sent = True
+            yield (np.clip(segment, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+_worker_tts = None
+
+
+def _init_synthesis_worker(num_threads: int) -> None:
+    """Loads a private TTS model in a pool worker with a bounded torch thread count."""
+    global _worker_tts
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    _worker_tts = TTS(in_process=True)
+    _worker_tts.warm_up()
+
+
+def _worker_sample_rate() -> int:
+    return _worker_tts.model.sample_rate
+
+
+def _synthesize_in_worker(voice: str, text: str) -> np.ndarray:
+    return TTS._to_frames(_worker_tts._synthesize(voice, text))
@@ -1,5 +1,211 @@
 from SinisterSixSystems.logging import logger
+import os
 
 class TTSConfig:
     def __init__(self) -> None:
-        self.default_audio_path = "./artifacts/audio/temp.wav"
\ No newline at end of file
+        self.default_audio_path = "./artifacts/audio/temp.wav"
+        # Seconds of silence inserted between transcript lines (drawn once per transcript).
+        self.silence_range = (0.1, 0.3)
+        # Encoded voice prompts kept in memory (LRU) and optionally serialized to disk.
+        self.voice_state_cache_size = 8
+        self.voice_state_cache_dir = "./artifacts/cache/voice_states"
+        self.preload_voices = ["alba", "eponine"]
+        # Process pool for synthesizing transcript lines in parallel; 1 keeps synthesis in-process.
+        # Every worker holds its own model, so parallel synthesis is opt-in (e.g. TTS_PARALLEL_WORKERS=4).
+        self.parallel_workers = max(1, int(os.getenv("TTS_PARALLEL_WORKERS", "1")))
+        # torch intra-op threads per worker, sized so workers do not oversubscribe the CPU.
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // self.parallel_workers)
+        # Segments submitted ahead of the one being written, per worker.
+        self.parallel_prefetch = 2
+
+
+class PlaceholderExecutorConfig:
+    def __init__(self) -> None:
+        self.max_workers = 8
+        # Dispatch placeholders while the markdown is still streaming in, instead of after
+        # the full response.
+        self.stream_markdown = os.getenv("STREAM_MARKDOWN", "true").lower() in ("1", "true", "yes")
+        # Seconds streamed mermaid/graph placeholders are held so nearby ones share one batched LLM call.
+        self.stream_batch_delay = 1.5
+        # Maximum number of placeholders of each type running at the same time.
+        self.concurrency_limits = {
+            "graph": 4,
+            "mermaid": 4,
+            "image": 4,
+        }
+        # Seconds a placeholder may run (after it has started) before it is reported as timed out.
+        self.timeouts = {
+            "graph": 180,
+            "mermaid": 90,
+            "image": 120,
+        }
+        self.poll_interval = 0.5
+
+
+class PlotWorkerPoolConfig:
+    def __init__(self) -> None:
+        self.enabled = True
+        self.pool_size = 2
+        # Workers are replaced after this many jobs to keep leaked figures/memory in check.
+        self.max_jobs_per_worker = 50
+        self.timeout = 15
+        # Address-space limit (bytes) applied inside each worker on POSIX systems; None disables it.
+        self.memory_limit = 2 * 1024 * 1024 * 1024
+        # Attempts to start a replacement worker before the pool runs short.
+        self.respawn_attempts = 3
+
+
+class PlotCodeCheckConfig:
+    def __init__(self) -> None:
+        self.enabled = True
+        # Apply deterministic fixes (save path, missing savefig, show() calls, common imports).
+        self.autofix = True
+        # Top-level modules generated plotting code may import; `os` is needed to create the output folder.
+        self.allowed_modules = ["matplotlib", "mpl_toolkits", "numpy", "math", "os"]
+
+
+class ArtifactCacheConfig:
+    def __init__(self) -> None:
+        self.enabled = True
+        self.root = "./artifacts/cache/placeholders"
+        self.max_bytes = 1024 * 1024 * 1024
+        # Bump when the generation model or prompts change so stale renders are not reused.
+        self.version = "gemini-2.5-flash/v1"
+
+
+class GraphRenderCacheConfig(ArtifactCacheConfig):
+    def __init__(self) -> None:
+        super().__init__()
+        # Rendered graphs keyed by the normalized plotting code rather than the prompt.
+        self.root = "./artifacts/cache/graph_renders"
+        self.max_bytes = 256 * 1024 * 1024
+        # Bump when the plotting environment (matplotlib version/style) changes.
+        self.version = "matplotlib/v1"
+
+
+class LLMCacheConfig:
+    def __init__(self) -> None:
+        self.enabled = True
+        self.path = "./artifacts/cache/llm_cache.sqlite3"
+        self.ttl_seconds = 7 * 24 * 60 * 60
+        self.max_entries = 20000
+        # Optional embedding-similarity tier, consulted only after an exact-match miss.
+        self.semantic_enabled = False
+        self.semantic_threshold = 0.97
+        self.semantic_scan_limit = 500
+        self.embedding_model = "gemini-embedding-001"
+
+
+class JobQueueConfig:
+    def __init__(self) -> None:
+        self.max_workers = 4
+        # Finished jobs beyond this count are dropped, oldest first.
+        self.max_retained_jobs = 500
+        # Seconds an SSE stream waits for new events before sending a keep-alive.
+        self.keepalive_seconds = 15
+        # Static root of the frontend; artifact URLs (/artifacts/...) are copied below it as they finish.
+        self.publish_dir = os.getenv("ARTIFACT_PUBLISH_DIR", "/mnt/2028B41628B3E944/Projects/eduflow-ai/public")
+
+
+class MermaidRenderConfig:
+    def __init__(self) -> None:
+        self.enabled = True
+        # Number of warm browser pages (diagrams rendered concurrently).
+        self.pool_size = 2
+        self.timeout = 20
+        self.device_scale_factor = 2
+        # Local file path or URL of mermaid.js. The version is pinned so diagrams render the
+        # same everywhere; a URL is downloaded once into `mermaid_js_cache_dir`.
+        self.mermaid_js = os.getenv("MERMAID_JS", "https://cdn.jsdelivr.net/npm/mermaid@10.9.1/dist/mermaid.min.js")
+        self.mermaid_js_cache_dir = "./artifacts/cache/mermaid_js"
+        # "auto" draws diagrams up to `native_max_nodes` nodes with the in-process Pillow
+        # renderer and larger ones with the browser; "native" / "browser" force one backend.
+        # The native renderer is always the last resort when every other backend fails.
+        self.backend = os.getenv("MERMAID_BACKEND", "auto")
+        self.native_max_nodes = 12
+        self.native_scale = 2
+        self.native_font_size = 14
+
+
+class ImageFetcherConfig:
+    def __init__(self) -> None:
+        # Candidate image URLs requested from the search and downloaded concurrently.
+        self.max_candidates = 7
+        self.max_workers = 4
+        self.connect_timeout = 5
+        self.read_timeout = 15
+        self.search_timeout = 15
+        # Candidates larger than this are abandoned mid-download.
+        self.max_bytes = 10 * 1024 * 1024
+        self.min_dimension = 100
+        # Guards against decompression bombs.
+        self.max_pixels = 40_000_000
+        self.user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+class ImageNormalizeConfig:
+    def __init__(self) -> None:
+        self.enabled = True
+        # Longest side of the stored image; larger downloads are downscaled.
+        self.max_dimension = 1600
+        # "auto" keeps photos as JPEG and images with transparency or few colors as PNG;
+        # "jpeg", "png" or "webp" force one format.
+        self.format = "auto"
+        self.jpeg_quality = 82
+        self.webp_quality = 80
+        # Optional widths of extra downscaled copies (`image_<idx>_<width>w.<ext>`) for srcset.
+        self.variant_widths = []
+
+
+class IngestionConfig:
+    def __init__(self) -> None:
+        self.chunk_size = 1000
+        self.chunk_overlap = 200
+        # Chunks per embedding request and embedding requests in flight at the same time.
+        self.batch_size = 64
+        self.max_concurrency = 4
+        self.max_retries = 5
+        self.backoff_initial = 1.0
+        self.backoff_max = 30.0
+        # Per-file progress, so an interrupted ingestion resumes where it stopped.
+        self.progress_dir = "./artifacts/ingestion"
+
+
+class RAGConfig:
+    def __init__(self) -> None:
+        self.persist_directory = "./chroma_db"
+        self.collection_name = "sinister_six_systems"
+        # "google" embeds remotely with Gemini; "local" runs a sentence-transformers model on the CPU.
+        # Each backend gets its own collection, since their vectors are not comparable.
+        self.embedding_backend = os.getenv("RAG_EMBEDDING_BACKEND", "google")
+        self.google_model = "gemini-embedding-001"
+        self.local_model = os.getenv("RAG_LOCAL_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        self.device = "cpu"
+        # "torch", or "onnx" for ONNX Runtime inference; `onnx_file_name` selects a
+        # quantized export, e.g. "onnx/model_qint8_avx512.onnx".
+        self.local_runtime = os.getenv("RAG_LOCAL_RUNTIME", "torch")
+        self.onnx_file_name = os.getenv("RAG_ONNX_FILE_NAME")
+        self.encode_batch_size = 32
+        # Inference threads for the local model; None leaves the library default.
+        self.num_threads = None
+        # Query embeddings kept in memory (LRU); 0 disables the cache.
+        self.query_cache_size = 1024
+        # Chunks returned to the caller, and candidates taken from each retriever before fusion.
+        self.retrieval_k = 4
+        self.candidate_k = 20
+        # BM25 keyword retrieval fused with the vector search by reciprocal rank fusion.
+        self.hybrid_enabled = True
+        self.rrf_k = 60
+        self.bm25_k1 = 1.5
+        self.bm25_b = 0.75
+        # Optional local cross-encoder that re-scores the best fused candidates.
+        self.reranker_enabled = os.getenv("RAG_RERANKER", "false").lower() in ("1", "true", "yes")
+        self.reranker_model = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        self.rerank_candidates = 12
+        # Ingest every document into its own collection, so document-scoped queries only
+        # search that document. Every shard is also copied into the shared collection,
+        # which serves unscoped queries and documents ingested before partitioning.
+        self.partition_by_document = True
+        # Shards kept open (collection handle plus in-memory keyword index); the least
+        # recently used one is dropped when another is opened.
+        self.max_open_shards = 8
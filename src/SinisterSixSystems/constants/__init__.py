@@ -17,6 +17,27 @@ Query/Instructions:
 {query}
 
 
+"""
+
+GRAPH_BATCH_GENERATION_PROMPT = """
+You are a graph generator agent. You will be given several graph requests and you will have to generate one graph for each of them, strictly based on its query.
+For every request, generate a complete, standalone python code that can be used to generate that graph.
+
+Rules to follow:
+1. Generate exactly one code per request and set its `graph_id` to the request's graph_id.
+2. Make sure the dimensions and sizes of the graph are appropriate and realistic and must prioritize the readability and clarity of the graph.
+3. Make sure the graph is not too clustered and must be easy to understand and must be visually appealing.
+4. To generate the graph, you must only use matplotlib library and must not use any other library.
+5. Every code must be complete and must be able to run on its own without any errors.
+6. Make sure each graph is saved in the `path` directory of its request.
+7. The name of each graph should be the same as the `file_name` of its request.
+8. DON'T HALUCINATE THE GIVEN PATHS AND FILE NAMES, USE THE EXACT VALUES PROVIDED IN THE REQUESTS.
+Return only the python code of each graph, without markdown fences.
+
+Graph Requests:
+{graphs}
+
+
 """
 
 GRAPH_CODE_FIXER_PROMPT = """
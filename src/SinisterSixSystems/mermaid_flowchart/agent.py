@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 try:
     from mmdc import MermaidConverter
     MMDC_AVAILABLE = True
@@ -8,6 +9,10 @@ except ImportError:
 
 from .llm_generator import LLMGraphGenerator
 from .mermaid_utils import validate_mermaid
+from .mermaid_parser import MermaidEdge, MermaidNode, MermaidSyntaxError, parse_flowchart
+from .render_service import get_render_service
+from .native_renderer import NativeFlowchartRenderer
+from SinisterSixSystems.config import MermaidRenderConfig
 import base64
 import requests
 
@@ -15,24 +20,40 @@ class FlowchartAgent:
     def __init__(self, api_key=None):
         self.llm = LLMGraphGenerator(api_key)
         self.converter = MermaidConverter() if MMDC_AVAILABLE else None
+        self.render_config = MermaidRenderConfig()
+        self.render_service = get_render_service()
+        self.native_renderer = NativeFlowchartRenderer(self.render_config)
+        self.session = requests.Session()
 
-    def generate_png(self, topic: str, output_path: Path):
-        code = self.llm.generate(topic)
+    def generate_png(self, topic: str, output_path: Path, code: Optional[str] = None):
+        """
+        Renders a flowchart for `topic`. Pre-generated `code` (e.g. from
+        `LLMGraphGenerator.generate_batch`) skips the per-topic LLM call.
+        """
+        code = self.prepare_code(code if code is not None else self.llm.generate(topic))
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
 
-      
-        lines = [line.strip() for line in code.splitlines() if line.strip()]
-        if not lines or not lines[0].startswith("graph TD"):
-            lines.insert(0, "graph TD")
+        success = self.render_code(code, output_path)
 
-        
-        if not any("-->" in line for line in lines):
-            lines.append("A([Start]) --> B([End])")  
+        if not success:
+            print("Complex graph generation failed. Generating simple fallback...")
+            success = self.render_fallback(topic, output_path)
 
-        code = "\n".join(lines)
+        return output_path
 
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+    def render_code(self, code: str, output_path: Path) -> bool:
+        """
+        Renders Mermaid code through the configured backends in order: native for
+        small diagrams (or when forced), then the local browser, the mmdc converter
+        and mermaid.ink, with the native renderer as the last resort.
+        """
+        native_first = self._prefers_native(code)
+        if native_first and self.render_native(code, output_path):
+            return True
 
-        success = False
+        if self.render_local(code, output_path):
+            return True
 
         if self.converter:
             try:
@@ -41,22 +62,72 @@ class FlowchartAgent:
 
                 
                 if output_path.exists() and output_path.stat().st_size >= 500:
-                    success = True
-                else:
-                    print("Local generation produced empty/missing file. Trying online fallback...")
+                    return True
+                print("Local generation produced empty/missing file. Trying online fallback...")
             except Exception as e:
                 print(f"Error generating PNG locally: {e}. Using fallback.")
-        
-        if not success:
-            success = self._generate_via_ink(code, output_path)
 
-        if not success:
-            print("Complex graph generation failed. Generating simple fallback...")
-            fallback_code = self._get_fallback_code(topic)
-                
-            success = self._generate_via_ink(fallback_code, output_path)
+        if self._generate_via_ink(code, output_path):
+            return True
 
-        return output_path
+        return not native_first and self.render_native(code, output_path)
+
+    def render_fallback(self, topic: str, output_path: Path) -> bool:
+        fallback_code = self._get_fallback_code(topic)
+        return self.render_native(fallback_code, output_path) or self._generate_via_ink(fallback_code, output_path)
+
+    def _prefers_native(self, code: str) -> bool:
+        backend = self.render_config.backend
+        if backend == "native":
+            return True
+        if backend != "auto":
+            return False
+        try:
+            ast = parse_flowchart(code, repair=True)
+        except MermaidSyntaxError:
+            return False
+        # The native renderer draws neither subgraphs nor styling
+        return not ast.has_subgraphs and not ast.styles and len(ast.nodes) <= self.render_config.native_max_nodes
+
+    def render_native(self, code: str, output_path: Path) -> bool:
+        """
+        Renders in-process with Pillow; needs no browser or network access.
+        """
+        return self.native_renderer.render(code, output_path)
+
+    def prepare_code(self, code: str) -> str:
+        """
+        Parses and auto-repairs flowchart code into its canonical form.
+
+        Returns:
+            str: The repaired code. Code the parser does not understand, and code with
+            subgraphs (which canonicalization would flatten), is returned unchanged,
+            since Mermaid itself may still render it.
+        """
+        try:
+            ast = parse_flowchart(code, repair=True)
+        except MermaidSyntaxError as e:
+            print(f"Passing unparsed Mermaid code to the renderers: {e}")
+            return code
+        if ast.has_subgraphs:
+            print("Passing Mermaid code with subgraphs to the renderers unchanged")
+            return code
+        if ast.repairs:
+            print(f"Repaired Mermaid code: {'; '.join(ast.repairs)}")
+        if not ast.edges:
+            ast.edges.append(MermaidEdge("Start", "End"))
+            ast.add_node(MermaidNode("Start", "Start", "stadium"), explicit=True)
+            ast.add_node(MermaidNode("End", "End", "stadium"), explicit=True)
+        return ast.to_code()
+
+    def render_local(self, code: str, output_path: Path) -> bool:
+        """
+        Renders through the persistent local render service, if one is running.
+        """
+        if self.render_service is None:
+            return False
+        # Not gated on validate_mermaid: the browser runs Mermaid itself and accepts syntax our parser does not
+        return self.render_service.render(code, output_path)
 
     def _generate_via_ink(self, code: str, output_path: Path) -> bool:
         """
@@ -71,7 +142,7 @@ class FlowchartAgent:
             url = f"https://mermaid.ink/img/{base64_string}?bgColor=FFFFFF"
             
             print("Requesting PNG from mermaid.ink...")
-            response = requests.get(url)
+            response = self.session.get(url, timeout=30)
             if response.status_code == 200:
                 with open(output_path, 'wb') as f:
                     f.write(response.content)
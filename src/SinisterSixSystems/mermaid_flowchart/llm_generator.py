@@ -1,23 +1,16 @@
 import os
+from typing import List
 from dotenv import load_dotenv
 from google import genai
+from google.genai import types
 from google.genai.errors import ClientError
-from .mermaid_utils import sanitize_mermaid
+from pydantic import BaseModel, Field
+from .mermaid_utils import sanitize_mermaid, validate_mermaid
+from .mermaid_parser import MermaidSyntaxError, repair_mermaid
 
 load_dotenv()
 
-class LLMGraphGenerator:
-    def __init__(self, api_key=None):
-        api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY/GOOGLE_API_KEY not set")
-        self.client = genai.Client(api_key=api_key)
-        self.model = "gemini-2.5-flash" 
-
-    def generate(self, topic: str) -> str:
-        prompt = f"""
-Generate Mermaid flowchart code for: "{topic}"
-
+RULES = """
 RULES:
 - Start with: graph TD
 - Node IDs: A, B, C...
@@ -25,7 +18,7 @@ RULES:
 - Shapes only:
   ([Start])
   ["Process"]
-  {{Decision}}
+  {Decision}
   (("Storage"))
 - NO introduction / conclusion / overview
 - NO edge labels
@@ -33,7 +26,26 @@ RULES:
 - Not too complex
 - Must contain real domain-specific steps
 - Include cycle if applicable
-- Return ONLY Mermaid code
+"""
+
+
+class MermaidDiagram(BaseModel):
+    id: int = Field(description="Index of the topic this diagram is for")
+    code: str = Field(description="Mermaid flowchart code only, no markdown fences")
+
+
+class LLMGraphGenerator:
+    def __init__(self, api_key=None):
+        api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY/GOOGLE_API_KEY not set")
+        self.client = genai.Client(api_key=api_key)
+        self.model = "gemini-2.5-flash"
+
+    def generate(self, topic: str) -> str:
+        prompt = f"""
+Generate Mermaid flowchart code for: "{topic}"
+{RULES}- Return ONLY Mermaid code
 """
         try:
             response = self.client.models.generate_content(
@@ -53,3 +65,53 @@ graph TD
     E --> B
 """
             return fallback
+
+    def generate_batch(self, topics: List[str]) -> List[str]:
+        """
+        Generates one flowchart per topic with a single structured-output call.
+
+        Every returned diagram is sanitized, repaired and validated on its own;
+        only topics whose diagram is missing or invalid are regenerated with
+        `generate`.
+
+        Returns:
+            list[str]: Mermaid code per topic, in input order.
+        """
+        if not topics:
+            return []
+
+        numbered = "\n".join(f"{idx}. {topic}" for idx, topic in enumerate(topics))
+        prompt = f"""
+Generate one Mermaid flowchart for EACH of the following topics:
+{numbered}
+{RULES}- Return one item per topic, with `id` set to the topic's number
+"""
+        diagrams = {}
+        try:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_schema=list[MermaidDiagram],
+                ),
+            )
+            for item in response.parsed or []:
+                diagrams.setdefault(item.id, item.code)
+        except ClientError as e:
+            print(f"Batch LLM error ({e.status_code}): {e}. Generating diagrams one by one.")
+        except Exception as e:
+            print(f"Could not parse batch response: {e}. Generating diagrams one by one.")
+
+        codes = []
+        for idx, topic in enumerate(topics):
+            code = diagrams.get(idx)
+            if code is not None:
+                try:
+                    code = repair_mermaid(sanitize_mermaid(code))
+                    validate_mermaid(code)
+                except MermaidSyntaxError as e:
+                    print(f"Diagram {idx} from the batch is invalid ({e}), regenerating.")
+                    code = None
+            codes.append(code if code is not None else self.generate(topic))
+        return codes
@@ -0,0 +1,328 @@
+import re
+from typing import List, Optional
+
+
+HEADER_PATTERN = re.compile(r"^(graph|flowchart)(?:\s+(TD|TB|LR|RL|BT))?\s*$", re.IGNORECASE)
+NODE_ID_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+# Longer arrows (`--->`, `====>`, `-..->`) only ask Mermaid for a longer link and are kept as written
+ARROW_PATTERN = re.compile(r"(-{2,}>|={2,}>|-\.+->|-{3,}|={3,}|-\.+-|-{2,}x|-{2,}o)")
+TEXT_ARROW_PATTERN = re.compile(r"--\s+([^-|>][^>]*?)\s+(-{2,}>)")
+PIPE_LABEL_PATTERN = re.compile(r"\|([^|]*)\|")
+CLASS_SUFFIX_PATTERN = re.compile(r":::[A-Za-z0-9_-]+")
+# Where an unclosed unquoted label ends: the whitespace before the next arrow
+UNCLOSED_LABEL_END_PATTERN = re.compile(rf"\s+(?={ARROW_PATTERN.pattern}|--\s)")
+IGNORED_PREFIXES = ("style ", "classDef ", "class ", "linkStyle ", "click ")
+
+# Opening bracket sequence -> (shape, expected closing sequence). Longest openers first.
+SHAPE_OPENERS = [
+    ("[((", "circle", "))]"),   # known LLM mistake, repaired to a circle
+    ("([", "stadium", "])"),
+    ("((", "circle", "))"),
+    ("[(", "cylinder", ")]"),
+    ("[[", "subroutine", "]]"),
+    ("{{", "hexagon", "}}"),
+    ("[", "rect", "]"),
+    ("(", "round", ")"),
+    ("{", "rhombus", "}"),
+    (">", "asymmetric", "]"),
+]
+SHAPE_SYNTAX = {
+    "stadium": ("([", "])"),
+    "circle": ("((", "))"),
+    "cylinder": ("[(", ")]"),
+    "subroutine": ("[[", "]]"),
+    "hexagon": ("{{", "}}"),
+    "rect": ("[", "]"),
+    "round": ("(", ")"),
+    "rhombus": ("{", "}"),
+    "asymmetric": (">", "]"),
+}
+OPEN_CHARS = "([{"
+CLOSE_CHARS = ")]}"
+
+
+class MermaidSyntaxError(ValueError):
+    """Raised when Mermaid flowchart code cannot be parsed (or repaired)."""
+
+    def __init__(self, message: str, line: int = 0, column: int = 0):
+        self.message = message
+        self.line = line
+        self.column = column
+        location = f"line {line}, column {column}: " if line else ""
+        super().__init__(f"{location}{message}")
+
+
+class MermaidNode:
+    def __init__(self, node_id: str, text: Optional[str] = None, shape: str = "rect"):
+        self.id = node_id
+        self.text = text if text is not None else node_id
+        self.shape = shape
+
+    def to_code(self) -> str:
+        opener, closer = SHAPE_SYNTAX[self.shape]
+        text = self.text.replace('"', "#quot;")
+        return f'{self.id}{opener}"{text}"{closer}'
+
+    def __repr__(self) -> str:
+        return f"MermaidNode({self.id!r}, {self.text!r}, {self.shape!r})"
+
+
+class MermaidEdge:
+    def __init__(self, source: str, target: str, arrow: str = "-->", label: Optional[str] = None):
+        self.source = source
+        self.target = target
+        self.arrow = arrow
+        self.label = label
+
+    def to_code(self) -> str:
+        label = f"|{self.label}|" if self.label else ""
+        return f"{self.source} {self.arrow}{label} {self.target}"
+
+    def __repr__(self) -> str:
+        return f"MermaidEdge({self.source!r}, {self.target!r}, {self.arrow!r}, {self.label!r})"
+
+
+class FlowchartAST:
+    """
+    Parsed flowchart: direction, nodes in order of first appearance and edges.
+    `repairs` lists the automatic fixes applied while parsing, `warnings` the
+    statements that were dropped. Styling statements are not parsed but kept
+    verbatim in `styles`; `has_subgraphs` is set when subgraphs were flattened.
+    """
+
+    def __init__(self, direction: str = "TD"):
+        self.direction = direction
+        self.nodes = {}
+        self.edges: List[MermaidEdge] = []
+        self.repairs: List[str] = []
+        self.warnings: List[str] = []
+        self.styles: List[str] = []
+        self.has_subgraphs = False
+
+    def add_node(self, node: MermaidNode, explicit: bool) -> None:
+        existing = self.nodes.get(node.id)
+        if existing is None:
+            self.nodes[node.id] = node
+        elif explicit and existing.text == existing.id and existing.shape == "rect":
+            # A bare reference seen earlier gets its shape from the later definition
+            self.nodes[node.id] = node
+
+    def to_code(self) -> str:
+        """Serializes the flowchart to canonical Mermaid code."""
+        lines = [f"graph {self.direction}"]
+        lines.extend(f"    {node.to_code()}" for node in self.nodes.values())
+        lines.extend(f"    {edge.to_code()}" for edge in self.edges)
+        lines.extend(f"    {style}" for style in self.styles)
+        return "\n".join(lines)
+
+
+def _split_statements(line: str) -> List[tuple]:
+    """Splits a line on `;` outside of quotes, keeping each statement's column offset."""
+    statements, start, in_quotes = [], 0, False
+    for idx, char in enumerate(line):
+        if char == '"' and not (in_quotes and line[idx - 1] == "\\"):
+            in_quotes = not in_quotes
+        elif char == ";" and not in_quotes:
+            statements.append((line[start:idx], start))
+            start = idx + 1
+    statements.append((line[start:], start))
+    return statements
+
+
+class _StatementParser:
+    def __init__(self, text: str, line: int, column: int, ast: FlowchartAST, repair: bool):
+        self.text = text
+        self.pos = 0
+        self.line = line
+        self.column = column
+        self.ast = ast
+        self.repair = repair
+
+    def error(self, message: str) -> MermaidSyntaxError:
+        return MermaidSyntaxError(message, self.line, self.column + self.pos + 1)
+
+    def fix(self, message: str) -> None:
+        if not self.repair:
+            raise self.error(message)
+        self.ast.repairs.append(f"line {self.line}: {message}")
+
+    def skip_spaces(self) -> None:
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def parse(self) -> None:
+        source = self.parse_node()
+        while True:
+            self.skip_spaces()
+            if self.pos >= len(self.text):
+                return
+            arrow, label = self.parse_arrow()
+            target = self.parse_node()
+            self.ast.edges.append(MermaidEdge(source, target, arrow, label))
+            source = target
+
+    def parse_node(self) -> str:
+        self.skip_spaces()
+        match = NODE_ID_PATTERN.match(self.text, self.pos)
+        if not match:
+            found = self.text[self.pos] if self.pos < len(self.text) else "end of line"
+            raise self.error(f"expected a node id, found {found!r}")
+        node_id = match.group(0)
+        self.pos = match.end()
+        self.skip_class()
+
+        if self.pos < len(self.text) and self.text[self.pos] in "[({>":
+            text, shape = self.parse_shape(node_id)
+            self.skip_class()
+            self.ast.add_node(MermaidNode(node_id, text, shape), explicit=True)
+        else:
+            self.ast.add_node(MermaidNode(node_id), explicit=False)
+        return node_id
+
+    def skip_class(self) -> None:
+        """Drops a `:::className` suffix; styling is not part of the AST."""
+        match = CLASS_SUFFIX_PATTERN.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+
+    def parse_shape(self, node_id: str) -> tuple:
+        for opener, shape, expected in SHAPE_OPENERS:
+            if self.text.startswith(opener, self.pos):
+                break
+        if opener == "[((":
+            self.fix(f"node {node_id}: '[((' is not a valid shape, using a circle")
+        self.pos += len(opener)
+        self.skip_spaces()
+
+        if self.pos < len(self.text) and self.text[self.pos] == '"':
+            end = self.text.find('"', self.pos + 1)
+            while end != -1 and self.text[end - 1] == "\\":
+                end = self.text.find('"', end + 1)
+            if end == -1:
+                raise self.error(f"node {node_id}: unterminated quoted label")
+            text = self.text[self.pos + 1:end].replace('\\"', '"')
+            self.pos = end + 1
+            self.skip_spaces()
+        else:
+            text = self.read_unquoted_label()
+            if self.pos >= len(self.text):
+                # An unclosed label must not swallow the rest of the statement
+                end = UNCLOSED_LABEL_END_PATTERN.search(text)
+                if end:
+                    self.pos -= len(text) - end.start()
+                    text = text[:end.start()]
+
+        closer_start = self.pos
+        while self.pos < len(self.text) and self.text[self.pos] in CLOSE_CHARS:
+            self.pos += 1
+        closer = self.text[closer_start:self.pos]
+
+        if closer == expected:
+            pass
+        elif not closer:
+            if self.pos < len(self.text) and not UNCLOSED_LABEL_END_PATTERN.match(self.text, self.pos):
+                raise self.error(f"node {node_id}: expected {expected!r} to close the label")
+            self.fix(f"node {node_id}: unclosed {opener!r}, closing it with {expected!r}")
+        elif closer.startswith(expected):
+            self.fix(f"node {node_id}: dropped stray {closer[len(expected):]!r} after the label")
+        else:
+            self.fix(f"node {node_id}: {opener!r} closed by {closer!r}, expected {expected!r}")
+
+        text = text.strip()
+        if not text:
+            raise self.error(f"node {node_id}: empty label")
+        return text, shape
+
+    def read_unquoted_label(self) -> str:
+        depth, start = 0, self.pos
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char in OPEN_CHARS:
+                depth += 1
+            elif char in CLOSE_CHARS:
+                if depth == 0:
+                    break
+                depth -= 1
+            self.pos += 1
+        return self.text[start:self.pos]
+
+    def parse_arrow(self) -> tuple:
+        text_arrow = TEXT_ARROW_PATTERN.match(self.text, self.pos)
+        if text_arrow:
+            self.pos = text_arrow.end()
+            return text_arrow.group(2), text_arrow.group(1).strip()
+
+        match = ARROW_PATTERN.match(self.text, self.pos)
+        if not match:
+            if self.text.startswith("&", self.pos):
+                raise self.error("'&' node groups are not supported")
+            raise self.error(f"expected an arrow, found {self.text[self.pos:self.pos + 10]!r}")
+        self.pos = match.end()
+
+        label = None
+        self.skip_spaces()
+        pipe_label = PIPE_LABEL_PATTERN.match(self.text, self.pos)
+        if pipe_label:
+            label = pipe_label.group(1).strip() or None
+            self.pos = pipe_label.end()
+        return match.group(1), label
+
+
+def parse_flowchart(code: str, repair: bool = True) -> FlowchartAST:
+    """
+    Parses the Mermaid flowchart subset generated by the LLM in a single pass.
+
+    Args:
+        code: Mermaid code.
+        repair: Auto-fix known mistakes (missing header, mismatched or unclosed
+            bracket shapes, unsupported statements) instead of raising.
+    Returns:
+        FlowchartAST: The parsed nodes and edges.
+    Raises:
+        MermaidSyntaxError: With the line and column of the first unrecoverable error.
+    """
+    ast = None
+
+    for line_no, raw_line in enumerate(code.splitlines(), start=1):
+        line = raw_line.strip()
+        if not line or line.startswith("%%") or line.startswith("```"):
+            continue
+
+        if ast is None:
+            header = HEADER_PATTERN.match(line.rstrip(";").strip())
+            if header:
+                ast = FlowchartAST((header.group(2) or "TD").upper())
+                continue
+            if not repair:
+                raise MermaidSyntaxError("code must start with 'graph <direction>' or 'flowchart <direction>'", line_no, 1)
+            ast = FlowchartAST()
+            ast.repairs.append(f"line {line_no}: missing header, assumed 'graph TD'")
+
+        if line.startswith(IGNORED_PREFIXES):
+            ast.styles.append(line)
+            continue
+        if line.startswith("subgraph") or line == "end":
+            if not repair:
+                raise MermaidSyntaxError("subgraphs are not supported", line_no, 1)
+            ast.warnings.append(f"line {line_no}: flattened subgraph statement")
+            ast.has_subgraphs = True
+            continue
+
+        offset = len(raw_line) - len(raw_line.lstrip())
+        for statement, column in _split_statements(line):
+            if statement.strip():
+                _StatementParser(statement, line_no, offset + column, ast, repair).parse()
+
+    if ast is None:
+        raise MermaidSyntaxError("Mermaid code is empty")
+    return ast
+
+
+def repair_mermaid(code: str) -> str:
+    """
+    Parses, auto-repairs and re-serializes Mermaid flowchart code.
+
+    Raises:
+        MermaidSyntaxError: If the code cannot be repaired.
+    """
+    return parse_flowchart(code, repair=True).to_code()
@@ -1,5 +1,7 @@
 import re
 
+from .mermaid_parser import MermaidSyntaxError, parse_flowchart
+
 def sanitize_mermaid(code: str) -> str:
     """
     Cleans up Mermaid code from the LLM:
@@ -27,18 +29,17 @@ def sanitize_mermaid(code: str) -> str:
 
 def validate_mermaid(code: str):
     """
-    Validates sanitized Mermaid code.
+    Validates sanitized Mermaid code with the flowchart parser.
     Ensures:
-    - First meaningful line is 'graph TD'
+    - First meaningful line is a 'graph'/'flowchart' header
+    - Every statement parses, without auto-repair
     - At least one arrow exists
+
+    Raises:
+        MermaidSyntaxError: A ValueError carrying the line and column of the problem.
     """
-    lines = [line.strip() for line in code.splitlines() if line.strip()]
-    
-    if not lines:
-        raise ValueError("Mermaid code is empty")
-    
-    if not lines[0].startswith("graph TD"):
-        raise ValueError("Mermaid must start with graph TD")
-    
-    if not any("-->" in line for line in lines):
-        raise ValueError("Mermaid must contain arrows")
+    ast = parse_flowchart(code, repair=False)
+
+    if not ast.edges:
+        raise MermaidSyntaxError("Mermaid must contain arrows")
+    return ast
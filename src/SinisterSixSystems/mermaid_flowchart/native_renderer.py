@@ -0,0 +1,396 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import math
+import os
+import textwrap
+
+from PIL import Image, ImageDraw, ImageFont
+
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import MermaidRenderConfig
+from .mermaid_parser import FlowchartAST, MermaidSyntaxError, parse_flowchart
+
+
+FILL = (236, 236, 255)
+STROKE = (147, 112, 219)
+TEXT = (51, 51, 51)
+EDGE = (51, 51, 51)
+BACKGROUND = (255, 255, 255)
+
+PADDING_X = 16
+PADDING_Y = 10
+NODE_GAP = 40
+LAYER_GAP = 56
+MARGIN = 24
+LANE_GAP = 20
+WRAP_CHARS = 22
+ORDERING_SWEEPS = 4
+
+
+def _load_font(size: int):
+    for name in ("DejaVuSans.ttf", "Arial.ttf", "arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _break_cycles(ast: FlowchartAST) -> List[Tuple[str, str]]:
+    """
+    Returns the edges as a DAG: edges closing a cycle (found by DFS in node
+    order) are reversed so every node can be assigned a layer.
+    """
+    adjacency = {node_id: [] for node_id in ast.nodes}
+    for edge in ast.edges:
+        adjacency[edge.source].append(edge.target)
+
+    state = {}
+    back_edges = set()
+    for root in ast.nodes:
+        if root in state:
+            continue
+        state[root] = "active"
+        stack = [(root, iter(adjacency[root]))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node] = "done"
+                stack.pop()
+            elif state.get(child) == "active":
+                back_edges.add((node, child))
+            elif child not in state:
+                state[child] = "active"
+                stack.append((child, iter(adjacency[child])))
+
+    dag = []
+    for edge in ast.edges:
+        pair = (edge.source, edge.target)
+        if edge.source == edge.target:
+            continue
+        dag.append((edge.target, edge.source) if pair in back_edges else pair)
+    return dag
+
+
+def _assign_layers(nodes: List[str], dag: List[Tuple[str, str]]) -> Dict[str, int]:
+    """Longest-path layering over a topological order."""
+    incoming = {node: 0 for node in nodes}
+    children = {node: [] for node in nodes}
+    for source, target in dag:
+        incoming[target] += 1
+        children[source].append(target)
+
+    layer = {node: 0 for node in nodes}
+    ready = [node for node in nodes if incoming[node] == 0]
+    while ready:
+        node = ready.pop(0)
+        for child in children[node]:
+            layer[child] = max(layer[child], layer[node] + 1)
+            incoming[child] -= 1
+            if incoming[child] == 0:
+                ready.append(child)
+    return layer
+
+
+def _insert_dummies(ast: FlowchartAST, layer: Dict[str, int], dag: List[Tuple[str, str]]) -> Tuple[List[Tuple[str, str]], Dict[int, List[str]]]:
+    """
+    Splits every forward edge spanning more than one layer into a chain through one
+    dummy node per intermediate layer, so ordering keeps it clear of the nodes it passes.
+    Dummies are added to `layer`.
+
+    Returns:
+        tuple: (dag with the chains instead of the long edges, {edge index: dummy ids in flow order})
+    """
+    chains = {}
+    for index, edge in enumerate(ast.edges):
+        if edge.source != edge.target and layer[edge.target] - layer[edge.source] > 1:
+            chains[index] = [f"\0dummy_{index}_{depth}" for depth in range(layer[edge.source] + 1, layer[edge.target])]
+            for depth, dummy in enumerate(chains[index], start=layer[edge.source] + 1):
+                layer[dummy] = depth
+
+    spanning = {(edge.source, edge.target) for index, edge in enumerate(ast.edges) if index in chains}
+    dag = [pair for pair in dag if pair not in spanning]
+    for index, dummies in chains.items():
+        path = [ast.edges[index].source] + dummies + [ast.edges[index].target]
+        dag.extend(zip(path, path[1:]))
+    return dag, chains
+
+
+def _order_layers(layer: Dict[str, int], dag: List[Tuple[str, str]]) -> List[List[str]]:
+    """Orders nodes within each layer with alternating barycenter sweeps to reduce crossings."""
+    layers = [[] for _ in range(max(layer.values()) + 1)]
+    for node, index in layer.items():
+        layers[index].append(node)
+
+    parents = {node: [] for node in layer}
+    children = {node: [] for node in layer}
+    for source, target in dag:
+        parents[target].append(source)
+        children[source].append(target)
+
+    def sweep(indices, neighbours):
+        for index in indices:
+            position = {node: pos for row in layers for pos, node in enumerate(row)}
+
+            def barycenter(node):
+                linked = neighbours[node]
+                if not linked:
+                    return position[node]
+                return sum(position[other] for other in linked) / len(linked)
+
+            layers[index].sort(key=barycenter)
+
+    for _ in range(ORDERING_SWEEPS):
+        sweep(range(1, len(layers)), parents)
+        sweep(range(len(layers) - 2, -1, -1), children)
+    return layers
+
+
+def _clip(center: Tuple[float, float], size: Tuple[float, float], shape: str, toward: Tuple[float, float]) -> Tuple[float, float]:
+    """Point where the segment from a node's center toward `toward` leaves its outline."""
+    cx, cy = center
+    dx, dy = toward[0] - cx, toward[1] - cy
+    if dx == 0 and dy == 0:
+        return center
+    half_w, half_h = size[0] / 2, size[1] / 2
+    if shape == "rhombus":
+        scale = 1 / (abs(dx) / half_w + abs(dy) / half_h)
+    elif shape == "circle":
+        scale = 1 / math.sqrt((dx / half_w) ** 2 + (dy / half_h) ** 2)
+    else:
+        scale = min(half_w / abs(dx) if dx else math.inf, half_h / abs(dy) if dy else math.inf)
+    return cx + dx * scale, cy + dy * scale
+
+
+class NativeFlowchartRenderer:
+    """
+    In-process renderer for the flowchart subset the LLM generates.
+
+    Lays the graph out in layers (cycles broken by reversing back edges,
+    crossings reduced with barycenter ordering) and draws it with Pillow, so it
+    needs neither a browser nor network access.
+    """
+
+    def __init__(self, config: Optional[MermaidRenderConfig] = None):
+        self.config = config or MermaidRenderConfig()
+        self.scale = self.config.native_scale
+        self.font = _load_font(self.config.native_font_size * self.scale)
+        self.measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+    def _node_size(self, text: str, shape: str) -> Tuple[str, Tuple[int, int]]:
+        wrapped = "\n".join(textwrap.wrap(text, WRAP_CHARS) or [text])
+        left, top, right, bottom = self.measure.multiline_textbbox((0, 0), wrapped, font=self.font, align="center")
+        text_width, text_height = right - left, bottom - top
+        width = text_width + 2 * PADDING_X * self.scale
+        height = text_height + 2 * PADDING_Y * self.scale
+        if shape == "rhombus":
+            width, height = width * 1.6, height * 1.6
+        elif shape == "circle":
+            width = height = math.hypot(text_width, text_height) + 2 * PADDING_Y * self.scale
+        elif shape == "hexagon":
+            width += height
+        return wrapped, (int(width), int(height))
+
+    def layout(self, ast: FlowchartAST) -> Tuple[dict, Tuple[int, int], Dict[str, int], Dict[int, list]]:
+        """
+        Computes node boxes. Space for edges that run against the flow is reserved
+        as lanes on the far side of the cross axis; edges that skip layers are routed
+        through gaps left for them in the layers they cross.
+
+        Returns:
+            tuple: ({node_id: (center, size, wrapped_text)}, (image_width, image_height),
+            {node_id: layer}, {edge index: bend points of a layer-skipping edge})
+        """
+        nodes = list(ast.nodes)
+        dag = _break_cycles(ast)
+        layer = _assign_layers(nodes, dag)
+        lanes = sum(1 for edge in ast.edges if edge.source != edge.target and layer[edge.target] <= layer[edge.source])
+        dag, chains = _insert_dummies(ast, layer, dag)
+        layers = _order_layers(layer, dag)
+        horizontal = ast.direction in ("LR", "RL")
+
+        sized = {node: self._node_size(ast.nodes[node].text, ast.nodes[node].shape) for node in nodes}
+        for dummies in chains.values():
+            sized.update((dummy, ("", (LANE_GAP * self.scale, LANE_GAP * self.scale))) for dummy in dummies)
+        # Main axis runs along the flow direction, cross axis along each layer
+        main_extent = [max(sized[node][1][0 if horizontal else 1] for node in row) for row in layers]
+        cross_extent = [
+            sum(sized[node][1][1 if horizontal else 0] for node in row) + NODE_GAP * self.scale * (len(row) - 1)
+            for row in layers
+        ]
+        total_cross = max(cross_extent)
+
+        boxes = {}
+        main_pos = MARGIN * self.scale
+        for index, row in enumerate(layers):
+            cross_pos = MARGIN * self.scale + (total_cross - cross_extent[index]) / 2
+            main_center = main_pos + main_extent[index] / 2
+            for node in row:
+                wrapped, size = sized[node]
+                cross_size = size[1] if horizontal else size[0]
+                cross_center = cross_pos + cross_size / 2
+                center = (main_center, cross_center) if horizontal else (cross_center, main_center)
+                boxes[node] = (center, size, wrapped)
+                cross_pos += cross_size + NODE_GAP * self.scale
+            main_pos += main_extent[index] + LAYER_GAP * self.scale
+
+        main_total = main_pos - LAYER_GAP * self.scale + MARGIN * self.scale
+        cross_total = total_cross + 2 * MARGIN * self.scale + lanes * LANE_GAP * self.scale
+        width, height = (main_total, cross_total) if horizontal else (cross_total, main_total)
+
+        # Reversed directions mirror the finished layout
+        if ast.direction in ("BT", "RL"):
+            for node, (center, size, wrapped) in boxes.items():
+                mirrored = (width - center[0], center[1]) if ast.direction == "RL" else (center[0], height - center[1])
+                boxes[node] = (mirrored, size, wrapped)
+
+        routes = {index: [boxes.pop(dummy)[0] for dummy in dummies] for index, dummies in chains.items()}
+        return boxes, (int(width), int(height)), layer, routes
+
+    def _draw_node(self, draw: ImageDraw.ImageDraw, shape: str, center, size, text: str) -> None:
+        cx, cy = center
+        w, h = size
+        box = (cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
+        line_width = max(1, self.scale)
+        outline = {"fill": FILL, "outline": STROKE, "width": line_width}
+
+        if shape == "stadium":
+            draw.rounded_rectangle(box, radius=h / 2, **outline)
+        elif shape == "round":
+            draw.rounded_rectangle(box, radius=8 * self.scale, **outline)
+        elif shape == "circle":
+            draw.ellipse(box, **outline)
+        elif shape == "rhombus":
+            draw.polygon([(cx, box[1]), (box[2], cy), (cx, box[3]), (box[0], cy)], **outline)
+        elif shape == "hexagon":
+            inset = h / 2
+            draw.polygon([(box[0] + inset, box[1]), (box[2] - inset, box[1]), (box[2], cy),
+                          (box[2] - inset, box[3]), (box[0] + inset, box[3]), (box[0], cy)], **outline)
+        elif shape == "cylinder":
+            cap = min(h / 4, 10 * self.scale)
+            draw.ellipse((box[0], box[3] - cap, box[2], box[3]), **outline)
+            draw.rectangle((box[0] + line_width, box[1] + cap / 2, box[2] - line_width, box[3] - cap / 2), fill=FILL)
+            draw.line([(box[0], box[1] + cap / 2), (box[0], box[3] - cap / 2)], fill=STROKE, width=line_width)
+            draw.line([(box[2], box[1] + cap / 2), (box[2], box[3] - cap / 2)], fill=STROKE, width=line_width)
+            draw.ellipse((box[0], box[1], box[2], box[1] + cap), **outline)
+        else:
+            draw.rectangle(box, **outline)
+            if shape == "subroutine":
+                inset = 6 * self.scale
+                draw.line([(box[0] + inset, box[1]), (box[0] + inset, box[3])], fill=STROKE, width=line_width)
+                draw.line([(box[2] - inset, box[1]), (box[2] - inset, box[3])], fill=STROKE, width=line_width)
+
+        draw.multiline_text(center, text, fill=TEXT, font=self.font, anchor="mm", align="center")
+
+    def _edge_points(self, edge, boxes: dict, shapes: dict, lane: Optional[float], horizontal: bool,
+                     via: List[Tuple[float, float]] = ()) -> List[Tuple[float, float]]:
+        """
+        Polyline for an edge: a segment along the flow (bent through `via` when it
+        skips layers), or a detour through its lane beside the diagram when the edge
+        points back against the flow.
+        """
+        (source_center, source_size, _), (target_center, target_size, _) = boxes[edge.source], boxes[edge.target]
+        if lane is None:
+            via = list(via)
+            start = _clip(source_center, source_size, shapes[edge.source], via[0] if via else target_center)
+            end = _clip(target_center, target_size, shapes[edge.target], via[-1] if via else source_center)
+            return [start] + via + [end]
+
+        if horizontal:
+            source_exit, target_entry = (source_center[0], lane), (target_center[0], lane)
+        else:
+            source_exit, target_entry = (lane, source_center[1]), (lane, target_center[1])
+        start = _clip(source_center, source_size, shapes[edge.source], source_exit)
+        end = _clip(target_center, target_size, shapes[edge.target], target_entry)
+        return [start, source_exit, target_entry, end]
+
+    def _draw_edge(self, draw: ImageDraw.ImageDraw, edge, points: List[Tuple[float, float]]) -> None:
+        line_width = max(1, self.scale)
+        width = line_width * 2 if edge.arrow.startswith("==") else line_width
+
+        for start, end in zip(points, points[1:]):
+            if "." in edge.arrow:
+                steps = max(1, int(math.dist(start, end) / (6 * self.scale)))
+                for step in range(0, steps, 2):
+                    a, b = step / steps, min(step + 1, steps) / steps
+                    draw.line([(start[0] + (end[0] - start[0]) * a, start[1] + (end[1] - start[1]) * a),
+                               (start[0] + (end[0] - start[0]) * b, start[1] + (end[1] - start[1]) * b)], fill=EDGE, width=width)
+            else:
+                draw.line([start, end], fill=EDGE, width=width)
+
+        if edge.arrow.endswith(">"):
+            start, end = points[-2], points[-1]
+            angle = math.atan2(end[1] - start[1], end[0] - start[0])
+            head = 9 * self.scale
+            draw.polygon([
+                end,
+                (end[0] - head * math.cos(angle - 0.4), end[1] - head * math.sin(angle - 0.4)),
+                (end[0] - head * math.cos(angle + 0.4), end[1] - head * math.sin(angle + 0.4)),
+            ], fill=EDGE)
+
+        if edge.label:
+            # Labels sit on the middle segment, which is the lane for detoured edges
+            start, end = points[len(points) // 2 - 1], points[len(points) // 2]
+            middle = ((start[0] + end[0]) / 2, (start[1] + end[1]) / 2)
+            left, top, right, bottom = draw.textbbox(middle, edge.label, font=self.font, anchor="mm")
+            draw.rectangle((left - 3, top - 2, right + 3, bottom + 2), fill=BACKGROUND)
+            draw.text(middle, edge.label, fill=TEXT, font=self.font, anchor="mm")
+
+    def _draw_self_loop(self, draw: ImageDraw.ImageDraw, center, size) -> None:
+        cx, cy = center
+        radius = size[1] / 3
+        draw.arc((cx + size[0] / 2 - radius, cy - radius, cx + size[0] / 2 + radius, cy + radius), 270, 90,
+                 fill=EDGE, width=max(1, self.scale))
+
+    def render(self, code: str, output_path: Path) -> bool:
+        """
+        Renders flowchart code to a PNG file.
+
+        Returns:
+            bool: True if the PNG was written, False if the code could not be parsed or drawn.
+        """
+        try:
+            ast = parse_flowchart(code, repair=True)
+        except MermaidSyntaxError as e:
+            logger.error(f"Native render skipped, unparsable Mermaid code: {e}")
+            return False
+        if not ast.nodes:
+            return False
+
+        try:
+            boxes, size, layer, routes = self.layout(ast)
+            image = Image.new("RGB", size, BACKGROUND)
+            draw = ImageDraw.Draw(image)
+            shapes = {node_id: node.shape for node_id, node in ast.nodes.items()}
+            horizontal = ast.direction in ("LR", "RL")
+
+            axis = 1 if horizontal else 0
+            lane = max(center[axis] + node_size[axis] / 2 for center, node_size, _ in boxes.values())
+            # Lanes start beyond the layer-skipping edges as well, which may run past the outermost node
+            lane = max([lane] + [point[axis] + LANE_GAP * self.scale / 2 for points in routes.values() for point in points])
+            for index, edge in enumerate(ast.edges):
+                if edge.source == edge.target:
+                    self._draw_self_loop(draw, *boxes[edge.source][:2])
+                    continue
+                edge_lane = None
+                if layer[edge.target] <= layer[edge.source]:
+                    lane += LANE_GAP * self.scale
+                    edge_lane = lane
+                points = self._edge_points(edge, boxes, shapes, edge_lane, horizontal, routes.get(index, ()))
+                self._draw_edge(draw, edge, points)
+            for node_id, (center, node_size, wrapped) in boxes.items():
+                self._draw_node(draw, shapes[node_id], center, node_size, wrapped)
+
+            output_path = Path(output_path)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+            image.save(tmp_path, format="PNG")
+            os.replace(tmp_path, output_path)
+            return True
+        except Exception as e:
+            logger.error(f"Native Mermaid render failed: {e}")
+            return False
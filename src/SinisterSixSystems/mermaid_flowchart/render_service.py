@@ -0,0 +1,255 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+import asyncio
+import itertools
+import os
+import tempfile
+import threading
+import urllib.request
+
+try:
+    from playwright.async_api import async_playwright
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+    async_playwright = None
+
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import MermaidRenderConfig
+
+
+PAGE_HTML = """
+<!DOCTYPE html>
+<html>
+  <body style="margin:0; background:#FFFFFF;">
+    <div id="container" style="display:inline-block; padding:16px; background:#FFFFFF;"></div>
+  </body>
+</html>
+"""
+
+RENDER_SCRIPT = """
+async ([id, code]) => {
+    const container = document.getElementById("container");
+    container.innerHTML = "";
+    const { svg } = await mermaid.render(id, code);
+    container.innerHTML = svg;
+    return true;
+}
+"""
+
+
+class MermaidRenderService:
+    """
+    Long-lived local Mermaid renderer.
+
+    A single headless Chromium is started on a background event loop with a pool
+    of pages that already have mermaid.js loaded. Render requests are queued onto
+    that loop, so diagrams are rendered without a network round-trip or a cold
+    renderer start per call.
+
+    A page that fails a render is closed and replaced; pages that cannot be
+    replaced right away are recreated by the next request, and a disconnected
+    browser is relaunched.
+    """
+
+    def __init__(self, config: Optional[MermaidRenderConfig] = None):
+        self.config = config or MermaidRenderConfig()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="mermaid-render", daemon=True)
+        self.thread.start()
+
+        self.playwright = None
+        self.browser = None
+        self.browser_lock = None
+        self.pages = None
+        # Pages lost to failures that still have to be recreated
+        self.missing = 0
+        self.script_path = None
+        self.counter = itertools.count()
+        self.started = asyncio.run_coroutine_threadsafe(self._start(), self.loop)
+
+    def _local_script(self) -> Optional[str]:
+        """
+        Path of a local mermaid.js. A configured URL is downloaded once into the cache
+        directory, so later starts work offline; None if it cannot be fetched.
+        """
+        if os.path.exists(self.config.mermaid_js):
+            return self.config.mermaid_js
+        cache_dir = Path(self.config.mermaid_js_cache_dir)
+        # The pinned version is part of the URL, so a version bump downloads a new copy
+        name = "_".join(part for part in self.config.mermaid_js.split("/")[-3:] if part)
+        path = cache_dir / name
+        if path.exists():
+            return str(path)
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            with urllib.request.urlopen(self.config.mermaid_js, timeout=30) as response:
+                script = response.read()
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(script)
+            os.replace(tmp_path, path)
+            logger.info(f"Cached {self.config.mermaid_js} at {path}")
+            return str(path)
+        except Exception as e:
+            logger.warning(f"Could not cache mermaid.js, loading it from {self.config.mermaid_js}: {e}")
+            return None
+
+    async def _new_page(self):
+        page = await self.browser.new_page(device_scale_factor=self.config.device_scale_factor)
+        try:
+            await page.set_content(PAGE_HTML)
+            if self.script_path:
+                await page.add_script_tag(path=self.script_path)
+            else:
+                await page.add_script_tag(url=self.config.mermaid_js)
+            await page.evaluate("mermaid.initialize({ startOnLoad: false, theme: 'default', securityLevel: 'strict' })")
+        except Exception:
+            await page.close()
+            raise
+        return page
+
+    async def _ensure_browser(self) -> None:
+        """Relaunches the browser after it disconnected (crash, OOM kill); its pages are recreated lazily."""
+        async with self.browser_lock:
+            if self.browser is not None and self.browser.is_connected():
+                return
+            if self.browser is not None:
+                logger.warning("Mermaid render browser disconnected, restarting it")
+            while not self.pages.empty():
+                self.pages.get_nowait()
+                self.missing += 1
+            self.browser = await self.playwright.chromium.launch(headless=True)
+
+    async def _replenish(self) -> None:
+        """Recreates missing pages; whatever still fails is retried by the next request."""
+        while self.missing > 0:
+            self.missing -= 1
+            try:
+                await self._ensure_browser()
+                page = await self._new_page()
+            except Exception as e:
+                self.missing += 1
+                logger.error(f"Could not create a mermaid render page: {e}")
+                return
+            await self.pages.put(page)
+
+    async def _start(self) -> None:
+        self.script_path = await asyncio.to_thread(self._local_script)
+        self.playwright = await async_playwright().start()
+        self.browser_lock = asyncio.Lock()
+        self.pages = asyncio.Queue()
+        self.missing = self.config.pool_size
+        await self._replenish()
+        if self.pages.empty():
+            raise RuntimeError("No mermaid render page could be created")
+        logger.info(f"Mermaid render service ready with {self.pages.qsize()} pages")
+
+    async def _release(self, page, healthy: bool) -> None:
+        """Returns a page to the pool, replacing it when the render that used it failed."""
+        if healthy:
+            await self.pages.put(page)
+            return
+        try:
+            await page.close()
+        except Exception:
+            pass
+        self.missing += 1
+        await self._replenish()
+
+    async def _render(self, code: str, output_path: Path, timeout: float, wait: float) -> bool:
+        if self.missing:
+            await self._replenish()
+        try:
+            # Never waits forever: if every page is lost and cannot be recreated the render fails
+            page = await asyncio.wait_for(self.pages.get(), wait)
+        except asyncio.TimeoutError:
+            logger.error(f"No mermaid render page became available within {wait}s")
+            return False
+
+        healthy = False
+        try:
+            await asyncio.wait_for(page.evaluate(RENDER_SCRIPT, [f"diagram{next(self.counter)}", code]), timeout)
+            element = await page.query_selector("#container")
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            await element.screenshot(path=str(output_path))
+            healthy = True
+            return output_path.exists() and output_path.stat().st_size > 0
+        except asyncio.TimeoutError:
+            logger.error(f"Mermaid render timed out after {timeout}s")
+            return False
+        except Exception as e:
+            logger.error(f"Mermaid render failed: {e}")
+            return False
+        finally:
+            # Failed renders may leave the page hung or half-initialized, so it is never reused
+            try:
+                await self._release(page, healthy)
+            except Exception as e:
+                logger.error(f"Could not return mermaid render page to the pool: {e}")
+
+    def render(self, code: str, output_path: Path, timeout: Optional[float] = None) -> bool:
+        """
+        Renders Mermaid code to a PNG file.
+
+        Returns:
+            bool: True if the PNG was written.
+        """
+        return self.render_batch([(code, output_path)], timeout)[0]
+
+    def render_batch(self, items: List[Tuple[str, Path]], timeout: Optional[float] = None) -> List[bool]:
+        """
+        Renders several diagrams concurrently across the page pool.
+
+        Args:
+            items: (mermaid code, output path) pairs.
+            timeout: Per-diagram render timeout in seconds.
+        Returns:
+            list[bool]: Success flag per item, in input order.
+        """
+        timeout = timeout or self.config.timeout
+        try:
+            self.started.result(timeout=60)
+        except Exception as e:
+            logger.error(f"Mermaid render service failed to start: {e}")
+            return [False] * len(items)
+
+        # Items wait for a free page, so the whole batch gets a proportionally longer deadline
+        rounds = -(-len(items) // self.config.pool_size)
+
+        async def run_all():
+            return await asyncio.gather(*(self._render(code, Path(path), timeout, timeout * rounds) for code, path in items))
+
+        future = asyncio.run_coroutine_threadsafe(run_all(), self.loop)
+        try:
+            return future.result(timeout=timeout * rounds + 10)
+        except Exception as e:
+            logger.error(f"Mermaid batch render failed: {e}")
+            future.cancel()
+            return [False] * len(items)
+
+    def close(self) -> None:
+        async def shutdown():
+            if self.browser is not None:
+                await self.browser.close()
+            if self.playwright is not None:
+                await self.playwright.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_render_service() -> Optional[MermaidRenderService]:
+    """Returns the process-wide render service, or None when Playwright is unavailable or it is disabled."""
+    global _service
+    if not PLAYWRIGHT_AVAILABLE or not MermaidRenderConfig().enabled:
+        return None
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = MermaidRenderService()
+    return _service
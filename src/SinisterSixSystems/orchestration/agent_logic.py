@@ -1,9 +1,10 @@
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from SinisterSixSystems.utils.llm_cache import get_llm_cache
 
 load_dotenv()
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0, cache=get_llm_cache("text_expert"))
 
 def router_node(state):
     print("📍 [DEBUG] Entered Router Node")
@@ -5,7 +5,8 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import START, END, StateGraph
-from SinisterSixSystems.components.tts import TTS
+from SinisterSixSystems.utils.registry import get_tts
+from SinisterSixSystems.utils.llm_cache import get_llm_cache
 from dotenv import load_dotenv
 import os
 from typing import List, TypedDict
@@ -22,19 +23,19 @@ class AudioAgentState(TypedDict):
 class AudioAgent:
     def __init__(self):
         self.output_parser = StrOutputParser()
-        self.model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=GOOGLE_API_KEY)
+        self.model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=GOOGLE_API_KEY, cache=get_llm_cache("audio_agent"))
         self.state = {
             "transcript": [],   
             "mode": "tutor",
             "markdown_document": ""
         }
 
-        self.tts = TTS()
+        self.tts = get_tts()
     
-    def generate_transcript_tutor(self, state: AudioAgentState):
+    def build_transcript_tutor(self, markdown_document: str) -> List[dict[str, str]]:
         prompt_template = PromptTemplate(input_variables=["markdown_document"], template=AUDIO_GENERATION_TUTOR_PROMPT)
         audio_generation_tutor_chain = prompt_template | self.model | self.output_parser
-        response = audio_generation_tutor_chain.invoke({"markdown_document": state.get("markdown_document", "")})
+        response = audio_generation_tutor_chain.invoke({"markdown_document": markdown_document})
         
         transcripts = []
         for idx, line in enumerate(response.split("\n")):
@@ -43,21 +44,14 @@ class AudioAgent:
                     "voice": "alba",
                     "text": line.strip().replace(":", " ")
                 })
+        return transcripts
 
-        self.tts.generate_batch_audio(transcripts, state.get("filepath", "./"), mode="tutor")
-
-        return {
-            "transcript": transcripts,
-            "markdown_document": state.get("markdown_document", ""),
-            "mode": state.get("mode", "tutor")
-        }
-
-    def generate_audio_story_mode(self, state: AudioAgentState):
+    def build_transcript_story(self, markdown_document: str) -> List[dict[str, str]]:
         transcripts = []
 
         prompt_template = PromptTemplate(input_variables=["markdown_document"], template=AUDIO_GENERATION_STORY_PROMPT)
         audio_generation_story_chain = prompt_template | self.model | self.output_parser
-        response = audio_generation_story_chain.invoke({"markdown_document": state.get("markdown_document", "")})
+        response = audio_generation_story_chain.invoke({"markdown_document": markdown_document})
         for line in response.split("\n"):
             if line.strip() != "":
                 if line.startswith("PA:"):
@@ -74,6 +68,26 @@ class AudioAgent:
                     "voice": "alba",
                     "text": line.strip().replace(":", " ")
                 })
+        return transcripts
+
+    def build_transcript(self, mode: str, markdown_document: str) -> List[dict[str, str]]:
+        if mode == "tutor":
+            return self.build_transcript_tutor(markdown_document)
+        return self.build_transcript_story(markdown_document)
+
+    def generate_transcript_tutor(self, state: AudioAgentState):
+        transcripts = self.build_transcript_tutor(state.get("markdown_document", ""))
+
+        self.tts.generate_batch_audio(transcripts, state.get("filepath", "./"), mode="tutor")
+
+        return {
+            "transcript": transcripts,
+            "markdown_document": state.get("markdown_document", ""),
+            "mode": state.get("mode", "tutor")
+        }
+
+    def generate_audio_story_mode(self, state: AudioAgentState):
+        transcripts = self.build_transcript_story(state.get("markdown_document", ""))
 
         self.tts.generate_batch_audio(transcripts, state.get("filepath", "./"), mode="story")
 
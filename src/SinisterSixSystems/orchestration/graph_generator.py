@@ -1,13 +1,19 @@
 from SinisterSixSystems.logging import logger
-from SinisterSixSystems.constants import GRAPH_GENERATION_PROMPT, GRAPH_CODE_FIXER_PROMPT
+from SinisterSixSystems.constants import GRAPH_GENERATION_PROMPT, GRAPH_CODE_FIXER_PROMPT, GRAPH_BATCH_GENERATION_PROMPT
+from SinisterSixSystems.config import PlotWorkerPoolConfig, PlotCodeCheckConfig
+from SinisterSixSystems.components.plot_worker_pool import get_plot_worker_pool
+from SinisterSixSystems.components.plot_code_checker import check_plot_code, plot_code_key
+from SinisterSixSystems.utils.artifact_cache import get_graph_render_cache
+from SinisterSixSystems.utils.llm_cache import get_llm_cache
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import START, END, StateGraph
 
-from typing import Dict, Any, List, Annotated, Union
+from typing import Dict, Any, List, Annotated, Optional, Union
 from typing_extensions import TypedDict
 from langchain_core.messages import BaseMessage
+from pydantic import BaseModel, ConfigDict, Field
 import re
 
 
@@ -31,10 +37,27 @@ class GraphGeneratorState(TypedDict):
     path: str
 
 
+class GraphCode(BaseModel):
+    # Models often answer numeric ids as JSON numbers; those must not fail the whole batch
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    graph_id: str = Field(description="graph_id of the request this code is for")
+    code: str = Field(description="Complete python code that saves the graph, without markdown fences")
+
+
+class GraphCodeBatch(BaseModel):
+    graphs: List[GraphCode] = Field(description="One entry per graph request")
+
+
 class GraphGenerator:
     def __init__(self):
         self.output_parser = StrOutputParser()
-        self.model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=GOOGLE_API_KEY)
+        self.model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=GOOGLE_API_KEY, cache=get_llm_cache("graph_generator"))
+        # Retries must reach the model: a cached response would reproduce the code that just failed
+        self.retry_model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=GOOGLE_API_KEY, cache=False)
+        self.pool_config = PlotWorkerPoolConfig()
+        self.check_config = PlotCodeCheckConfig()
+        self.render_cache = get_graph_render_cache()
         
         self.state = {
             "extracted_code": "",
@@ -45,15 +68,20 @@ class GraphGenerator:
             "query": ""
         }
     
-    def _validate_and_execute_python_code(self, python_code: str) -> None:
+    def _validate_and_execute_python_code(self, python_code: str, path: Optional[str] = None, file_name: Optional[str] = None) -> str:
         """
         Validates and executes Python code safely.
         
         Args:
             python_code: The Python code string to validate and execute
+            path: Directory the graph must be saved in (enables the static check)
+            file_name: File name the graph must be saved as
+            
+        Returns:
+            str: The code that was executed, after static auto-fixes
             
         Raises:
-            ValueError: If malicious code is detected
+            ValueError: If malicious code is detected or the static check fails
             RuntimeError: If code execution fails
         """
         def is_safe_ast(tree):
@@ -71,6 +99,37 @@ class GraphGenerator:
             #             return False
             return True
 
+        if self.check_config.enabled and path and file_name:
+            # Problems found statically cost neither an interpreter run nor an execution error round-trip
+            report = check_plot_code(python_code, path, file_name, self.check_config)
+            if report.fixes:
+                logger.info(f"Auto-fixed generated code: {'; '.join(report.fixes)}")
+            if not report.ok:
+                raise ValueError(f"Static check failed:\n{report.summary()}")
+            python_code = report.code
+            os.makedirs(path, exist_ok=True)
+
+        # Identical plotting code (up to formatting and output path) reuses the earlier render
+        code_key = None
+        output_path = None
+        if self.render_cache.config.enabled and path and file_name:
+            code_key = plot_code_key(python_code, path, file_name)
+            output_path = os.path.join(path, file_name)
+        if code_key:
+            cached = self.render_cache.lookup("graph_code", code_key)
+            if cached is not None:
+                self.render_cache.materialize(cached, output_path)
+                logger.info(f"Graph served from render cache: {cached}")
+                return python_code
+
+        if path and file_name:
+            # A previous output may be hard-linked to a cached render; savefig would
+            # truncate that shared file in place instead of writing a new one
+            try:
+                os.unlink(os.path.join(path, file_name))
+            except FileNotFoundError:
+                pass
+
         tmpfile_name = None
         try:
             tree = ast.parse(python_code)
@@ -78,6 +137,12 @@ class GraphGenerator:
                 logger.error(f"Malicious code detected: {python_code}")
                 raise ValueError("Malicious code detected!")
 
+            if self.pool_config.enabled:
+                # Run inside a warm worker that already has matplotlib imported
+                get_plot_worker_pool().execute(python_code, timeout=self.pool_config.timeout)
+                self._store_render(code_key, output_path)
+                return python_code
+
             # Write the safe code to a temporary file and run it
             with NamedTemporaryFile("w", suffix=".py", delete=False) as tmpf:
                 tmpf.write(python_code)
@@ -88,12 +153,14 @@ class GraphGenerator:
                 [sys.executable, tmpfile_name],
                 capture_output=True,
                 text=True,
-                timeout=15,
+                timeout=self.pool_config.timeout,
             )
 
             if process.returncode != 0:
                 logger.error(f"Python code execution failed: {process.stderr}")
                 raise RuntimeError(f"Code execution failed:\n{process.stderr}")
+            self._store_render(code_key, output_path)
+            return python_code
         finally:
             # Clean up temporary file if it exists
             if tmpfile_name:
@@ -102,12 +169,21 @@ class GraphGenerator:
                 except Exception:
                     pass
     
+    def _store_render(self, code_key: Optional[str], output_path: Optional[str]) -> None:
+        if code_key and output_path and os.path.exists(output_path):
+            self.render_cache.store("graph_code", code_key, output_path)
+
+    @staticmethod
+    def _file_name(state: GraphGeneratorState) -> str:
+        return f"graph_{state.get('graph_id', 'default')}.png"
+
     def generate_code(self, state: GraphGeneratorState):
         prompt_template = PromptTemplate(input_variables=["query","file_name","path"], template=GRAPH_GENERATION_PROMPT)
 
-        file_name = f"graph_{state.get('graph_id', 'default')}.png"
+        file_name = self._file_name(state)
 
-        graph_generator_chain = prompt_template | self.model | self.output_parser
+        model = self.retry_model if state.get("retry_count", 0) > 0 else self.model
+        graph_generator_chain = prompt_template | model | self.output_parser
         logger.warning({
             "query": state.get("query", ""),
             "file_name": file_name,
@@ -115,18 +191,20 @@ class GraphGenerator:
         })
         response = graph_generator_chain.invoke({"query": state.get("query", ""), "file_name": file_name, "path": state.get("path", "./artifacts/graphs")})
 
+        python_code = ""
         try:
             # StrOutputParser returns a string directly, not an object with .content
             code = response
             python_code = re.search(r"```python\n(.*)\n```", code, re.DOTALL).group(1)
             
             # Validate and execute the Python code
-            self._validate_and_execute_python_code(python_code)
+            python_code = self._validate_and_execute_python_code(python_code, state.get("path", "./artifacts/graphs"), file_name)
             
         except Exception as e:
             logger.error(f"Error generating code: {e}")
             return {
-                "extracted_code": "",
+                # The failing code goes to fix_code so it can be repaired rather than rewritten blind
+                "extracted_code": python_code,
                 "retry_count": state.get("retry_count", 0) + 1,
                 "error_message": str(e)
             }
@@ -136,10 +214,48 @@ class GraphGenerator:
             "error_message": ""
         }
     
+    def generate_batch(self, requests: List[Dict[str, str]]) -> Dict[str, str]:
+        """
+        Generates the code for several graphs with one structured LLM call.
+
+        Args:
+            requests: Dicts with `graph_id`, `query` and `path`.
+        Returns:
+            dict: graph_id -> python code. Graphs missing from the response are left out.
+        """
+        graphs = "\n".join(
+            # One line per request, so multi-line queries cannot blur into the next request
+            f"- graph_id: {r['graph_id']} | path: {r['path']} | file_name: graph_{r['graph_id']}.png | query: {' '.join(r['query'].split())}"
+            for r in requests
+        )
+        prompt_template = PromptTemplate(input_variables=["graphs"], template=GRAPH_BATCH_GENERATION_PROMPT)
+        batch_chain = prompt_template | self.model.with_structured_output(GraphCodeBatch)
+        response = batch_chain.invoke({"graphs": graphs})
+
+        codes = {}
+        for graph in response.graphs:
+            code = re.sub(r"^```(?:python)?\n|\n?```$", "", graph.code.strip())
+            # Ids are echoed back loosely at times ("graph_3", " 3 ")
+            graph_id = re.sub(r"^graph_", "", graph.graph_id.strip())
+            if code:
+                codes.setdefault(graph_id, code)
+        return codes
+
+    def execute_code(self, state: GraphGeneratorState):
+        """
+        Runs pre-generated code (e.g. from `generate_batch`) in the warm plotting pool.
+        """
+        try:
+            python_code = self._validate_and_execute_python_code(state.get("extracted_code", ""), state.get("path", "./artifacts/graphs"), self._file_name(state))
+        except Exception as e:
+            logger.error(f"Error executing code: {e}")
+            return {"error_message": str(e)}
+        return {"extracted_code": python_code, "error_message": ""}
+
     def fix_code(self, state: GraphGeneratorState):
         prompt_template = PromptTemplate(input_variables=["error_message", "faulty_code"], template=GRAPH_CODE_FIXER_PROMPT)
 
-        graph_code_fixer_chain = prompt_template | self.model | self.output_parser
+        graph_code_fixer_chain = prompt_template | self.retry_model | self.output_parser
         response = graph_code_fixer_chain.invoke({
             "error_message": state.get("error_message", ""), 
             "faulty_code": state.get("extracted_code", "")
@@ -151,7 +267,7 @@ class GraphGenerator:
             python_code = re.search(r"```python\n(.*)\n```", code, re.DOTALL).group(1)
             
             # Validate and execute the fixed Python code
-            self._validate_and_execute_python_code(python_code)
+            python_code = self._validate_and_execute_python_code(python_code, state.get("path", "./artifacts/graphs"), self._file_name(state))
             
             return {
                 "extracted_code": python_code,
@@ -169,6 +285,14 @@ class GraphGenerator:
     def should_retry(self, state: GraphGeneratorState):
         return state.get("retry_count", 0) < 5
 
+    def route_start(self, state: GraphGeneratorState) -> str:
+        """
+        Pre-generated code (e.g. from `generate_batch`) is executed directly instead of asking the model again.
+        """
+        if state.get("extracted_code"):
+            return "execute_code"
+        return "generate_code"
+
     def route_after_generate(self, state: GraphGeneratorState) -> Union[str, Any]:
         """
         Conditional routing function that determines the next node after generate_code.
@@ -193,13 +317,19 @@ class GraphGenerator:
             workflow.add_node("generate_code", self.generate_code)
             workflow.add_node("fix_code", self.fix_code)
 
-            workflow.add_edge(START, "generate_code")
+            workflow.add_node("execute_code", self.execute_code)
+
+            workflow.add_conditional_edges(START, self.route_start, ["generate_code", "execute_code"])
             
             # Add conditional edge: route to fix_code if error, otherwise END
             workflow.add_conditional_edges(
                 "generate_code",
                 self.route_after_generate
             )
+            workflow.add_conditional_edges(
+                "execute_code",
+                self.route_after_generate
+            )
             
             # Add conditional edge: route based on retry count and error status
             workflow.add_conditional_edges(
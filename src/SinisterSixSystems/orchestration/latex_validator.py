@@ -1,9 +1,9 @@
 import re
-from langchain_google_genai import ChatGoogleGenerativeAI
+from SinisterSixSystems.utils.registry import get_chat_model
 
 def latex_validator_node(state):
     print("📍 [DEBUG] Entered Dynamic LaTeX Validator Node")
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+    llm = get_chat_model("latex_validator")
     raw_latex = state.get("text_content", "")
     
     # 1. DYNAMIC PACKAGE MAPPING
@@ -1,18 +1,13 @@
-import os
 import re
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from SinisterSixSystems.utils.registry import get_chat_model
 
 load_dotenv()
 
 def markdown_generator_node(state):
     print("📍 [DEBUG] Entered Markdown Generator Node")
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        google_api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0
-    )
+    llm = get_chat_model("markdown_generator")
 
     validated_latex = state.get("text_content", "")
 
@@ -3,28 +3,41 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langgraph.graph import START, END, StateGraph
+from langgraph.config import get_stream_writer
 from langchain.agents import create_agent
 from langchain.tools import tool
 from bing_image_downloader import downloader
 import shutil
 
-from SinisterSixSystems.orchestration.graph_generator import GraphGenerator
-from SinisterSixSystems.orchestration.audio_agent import AudioAgent
+from SinisterSixSystems.orchestration.placeholder_executor import PlaceholderExecutor
+from SinisterSixSystems.orchestration.placeholder_stream import PLACEHOLDER_PATTERN, PlaceholderStreamParser, clean_markdown
 from SinisterSixSystems.constants import ORCHESTRATOR_PROMPT, MARKDOWN_AGENT_PROMPT, RAG_AGENT_PROMPT
 from SinisterSixSystems.components.rag import RAG
 from SinisterSixSystems.utils import sanitze_filename
-from SinisterSixSystems.mermaid_flowchart import FlowchartAgent
+from SinisterSixSystems.utils.artifact_cache import get_artifact_cache
+from SinisterSixSystems.utils.image_fetcher import get_image_fetcher
+from SinisterSixSystems.utils.image_normalizer import normalize_image
+from SinisterSixSystems.config import ImageNormalizeConfig, PlaceholderExecutorConfig
+from SinisterSixSystems.utils.llm_cache import get_llm_cache
+from SinisterSixSystems.utils.registry import get_graph_generator, get_graph_workflow, get_flowchart_agent, get_audio_agent
 
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
-from langchain_core.messages import ToolMessage
+from langchain_core.messages import ToolMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration
+from langchain_core.load import dumps
 
 from dotenv import load_dotenv
-from typing import TypedDict, List
+from typing import TypedDict, List, Callable, Iterator, Optional
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from PIL import Image
 import mimetypes
 import io
 import os
+import tempfile
+import threading
+import time
 import re
 import json
 import requests
@@ -33,6 +46,9 @@ load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GOOGLE_CSE_ID = os.getenv("GOOGLE_CSE_ID")
 
+MERMAID_CODE_PREFIXES = ('graph TD', 'graph LR', 'graph TB', 'graph BT',
+                         'flowchart', 'sequenceDiagram', 'classDiagram')
+
 class OrchestratorState(TypedDict):
     messages: list
     markdown_document: str
@@ -41,9 +57,13 @@ class OrchestratorState(TypedDict):
 
 
 class Orchestrator:
+    # Held while a finished placeholder is moved into place, keyed by its final file stem
+    publish_locks = {}
+    publish_locks_lock = threading.Lock()
+
     def __init__(self):
         self.output_parser = StrOutputParser()
-        self.model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=GOOGLE_API_KEY)
+        self.model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0.0, api_key=GOOGLE_API_KEY, cache=get_llm_cache("orchestrator"))
         
         self.tools = [
             self.graph_tool,
@@ -52,6 +72,8 @@ class Orchestrator:
         ]
 
         self.retrieval_system = RAG()
+        self.artifact_cache = get_artifact_cache()
+        self.executor_config = PlaceholderExecutorConfig()
 
         self.model_with_tools = self.model.bind_tools(self.tools)
     
@@ -65,17 +87,25 @@ class Orchestrator:
             str: Status message indicating completion of graph generation.
         """
 
-        graph_generator = GraphGenerator()
-        workflow_graph = graph_generator.compile()
-
         logger.info(f"Graph Tool Invoked with Query: {query}")
 
+        return Orchestrator.run_graph_workflow(query, graph_id, path)
+
+    @staticmethod
+    def run_graph_workflow(query: str, graph_id: str, path: str, extracted_code: str = "", cancelled: Optional[threading.Event] = None) -> str:
+        """
+        Runs the GraphGenerator workflow. Pre-generated `extracted_code` is executed
+        directly and only goes through fix_code if it fails. The workflow stops after
+        its current step once `cancelled` is set.
+        """
+        workflow_graph = get_graph_workflow()
+
         initial_state = {
             "query": query,
             "graph_id": graph_id, 
             "path": path,
             "file_name": f"graph_{graph_id}.png",
-            "extracted_code": "",
+            "extracted_code": extracted_code,
             "retry_count": 0,
             "error_message": ""
         }
@@ -83,6 +113,9 @@ class Orchestrator:
         for output in workflow_graph.stream(initial_state):
             for _, value in output.items():
                 print(value)
+            if cancelled is not None and cancelled.is_set():
+                logger.warning(f"Graph {graph_id} cancelled")
+                return "Graph generation cancelled."
         
         logger.info(f"Graph Tool Output: {value}")
 
@@ -111,14 +144,12 @@ class Orchestrator:
             # Detect if topic is already mermaid code or a description
             # Mermaid code typically starts with "graph TD", "graph LR", "flowchart", etc.
             topic_stripped = topic.strip()
-            is_mermaid_code = any(topic_stripped.startswith(prefix) for prefix in 
-                                   ['graph TD', 'graph LR', 'graph TB', 'graph BT', 
-                                    'flowchart', 'sequenceDiagram', 'classDiagram'])
+            is_mermaid_code = topic_stripped.startswith(MERMAID_CODE_PREFIXES)
             
             if is_mermaid_code:
                 logger.info("Detected raw mermaid code in placeholder, using it directly")
                 # Use the provided code directly
-                agent = FlowchartAgent()
+                agent = get_flowchart_agent()
                 # We need to pass the code directly, but FlowchartAgent.generate_png expects a topic
                 # So we'll directly call the internal method or modify the approach
                 
@@ -126,22 +157,17 @@ class Orchestrator:
                 # Actually, let's just use the agent's internal logic
                 code = topic_stripped
                 
-                # Clean and ensure first line is graph TD if needed
-                lines = [line.strip() for line in code.splitlines() if line.strip()]
-                if not lines or not any(lines[0].startswith(prefix) for prefix in 
-                                       ['graph', 'flowchart', 'sequenceDiagram', 'classDiagram']):
-                    lines.insert(0, "graph TD")
-                
-                code = "\n".join(lines)
-                
-                # Use the agent's internal methods directly
-                success = agent._generate_via_ink(code, output_path)
+                # Flowcharts are parsed and repaired up front; other diagram types pass through
+                if code.startswith(('graph', 'flowchart')):
+                    code = agent.prepare_code(code)
+
+                # Same backend order as generated diagrams (native / local browser / mermaid.ink)
+                success = agent.render_code(code, output_path)
                 
                 if not success:
                     # Try fallback
                     logger.warning("Direct code generation failed, trying simple fallback")
-                    fallback_code = agent._get_fallback_code(topic[:50])
-                    success = agent._generate_via_ink(fallback_code, output_path)
+                    success = agent.render_fallback(topic[:50], output_path)
                 
                 if success and output_path.exists():
                     logger.info(f"Mermaid flowchart generated at: {output_path}")
@@ -152,7 +178,7 @@ class Orchestrator:
             else:
                 logger.info("Detected description, generating mermaid code via LLM")
                 # Use the normal flow - generate code from description
-                agent = FlowchartAgent()
+                agent = get_flowchart_agent()
                 result_path = agent.generate_png(topic, output_path)
                 
                 logger.info(f"Mermaid flowchart generated at: {result_path}")
@@ -162,40 +188,140 @@ class Orchestrator:
             logger.error(f"Mermaid generation failed: {e}")
             return f"Mermaid generation failed: {e}"
 
+
+    @staticmethod
+    def render_mermaid_code(code: str, topic: str, placeholder_idx: int, path: str) -> str:
+        """
+        Renders pre-generated mermaid code for a placeholder, falling back to a simple diagram for `topic`.
+        """
+        try:
+            output_path = Path(path) / f"mermaid_{placeholder_idx}.png"
+            get_flowchart_agent().generate_png(topic, output_path, code=code)
+            if output_path.exists():
+                logger.info(f"Mermaid flowchart generated at: {output_path}")
+                return f"Mermaid flowchart generated at {output_path}"
+            return "Mermaid generation failed"
+        except Exception as e:
+            logger.error(f"Mermaid generation failed: {e}")
+            return f"Mermaid generation failed: {e}"
+
+    def pregenerate_mermaid(self, placeholders: List[dict]) -> dict:
+        """
+        Generates the code for every mermaid placeholder that needs the LLM in one batched call.
+        Raw mermaid code and placeholders already in the artifact cache are skipped.
+        Returns:
+            dict: Placeholder index -> mermaid code. Empty when batching would not save a call.
+        """
+        pending = [
+            p for p in placeholders
+            if p["type"] == "mermaid"
+            and not p["description"].strip().startswith(MERMAID_CODE_PREFIXES)
+            and not (self.artifact_cache.config.enabled and self.artifact_cache.contains("mermaid", p["description"]))
+        ]
+        if len(pending) < 2:
+            return {}
+
+        try:
+            codes = get_flowchart_agent().llm.generate_batch([p["description"] for p in pending])
+        except Exception as e:
+            logger.error(f"Batched mermaid generation failed: {e}")
+            return {}
+        logger.info(f"Generated {len(codes)} mermaid diagrams in one batch")
+        return {p["idx"]: code for p, code in zip(pending, codes)}
     
+    def pregenerate_graphs(self, placeholders: List[dict], path: str) -> dict:
+        """
+        Generates the code for every uncached graph placeholder with one batched LLM call.
+        Returns:
+            dict: Placeholder index -> python code. Empty when batching would not save a call.
+        """
+        pending = [
+            p for p in placeholders
+            if p["type"] == "graph"
+            and not (self.artifact_cache.config.enabled and self.artifact_cache.contains("graph", p["description"]))
+        ]
+        if len(pending) < 2:
+            return {}
+
+        try:
+            codes = get_graph_generator().generate_batch([
+                {"graph_id": str(p["idx"]), "query": p["description"], "path": path} for p in pending
+            ])
+        except Exception as e:
+            logger.error(f"Batched graph generation failed: {e}")
+            return {}
+        logger.info(f"Generated code for {len(codes)} of {len(pending)} graphs in one batch")
+        return {p["idx"]: codes[str(p["idx"])] for p in pending if str(p["idx"]) in codes}
+
     @staticmethod
-    def image_generation_tool(description: str, query: str, placeholder_idx: int) -> str:
+    def save_image(img_bytes: bytes, destination_stem: str) -> str:
+        """
+        Stores downloaded image bytes as `<stem><ext>`. With normalization enabled the
+        image is downscaled, stripped of metadata and re-encoded, and the extension
+        follows the format actually written.
+        """
+        config = ImageNormalizeConfig()
+        if config.enabled:
+            return str(normalize_image(img_bytes, Path(destination_stem), config).path)
+
+        final_path = f"{destination_stem}.png"
+        # Written next to the target and renamed, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(final_path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(img_bytes)
+        os.replace(tmp_path, final_path)
+        return final_path
+
+    @staticmethod
+    def image_generation_tool(description: str, query: str, placeholder_idx: int, cancelled: Optional[threading.Event] = None, output_dir: Optional[str] = None) -> str:
         """
         Generates an image using Bing Image Downloader.
         Args:
             description (str): The description for image search.
             query (str): User query (used for folder naming).
             placeholder_idx (int): Index for deterministic image naming.
+            cancelled (threading.Event): Optional flag that skips the Bing fallback once set.
+            output_dir (str): Folder the `images/` directory is created in; defaults to the query's processed files.
         Returns:
             str: Status message indicating completion.
         """
 
-        ROOT_DIR = f"./artifacts/processed_files/{sanitze_filename(query)}"
+        ROOT_DIR = output_dir or f"./artifacts/processed_files/{sanitze_filename(query)}"
         IMAGES_DIR = os.path.join(ROOT_DIR, "images")
-        TEMP_DIR = os.path.join(ROOT_DIR, "_bing_tmp")
 
         os.makedirs(IMAGES_DIR, exist_ok=True)
-        os.makedirs(TEMP_DIR, exist_ok=True)
 
         logger.info(f"Bing image generation invoked with description: {description[:200]}")
 
+        final_stem = os.path.join(IMAGES_DIR, f"image_{placeholder_idx}")
+        try:
+            # Candidates are fetched concurrently and validated as they stream; the first valid one wins
+            img_bytes = get_image_fetcher().fetch_bytes(description)
+            if img_bytes is not None:
+                final_path = Orchestrator.save_image(img_bytes, final_stem)
+                logger.info(f"Image saved to {final_path}")
+                return f"Image saved to {final_path}"
+        except Exception as e:
+            logger.warning(f"Image fetch failed ({e}), falling back to bing_image_downloader")
+
+        if cancelled is not None and cancelled.is_set():
+            return "Image generation cancelled."
+
+        # Unique scratch space per call, so concurrent placeholders and requests for the
+        # same query never share (or delete) each other's downloads
+        temp_dir = tempfile.mkdtemp(prefix=f"bing_{placeholder_idx}_")
         try:
             downloader.download(
                 description,
                 limit=7,
-                output_dir=TEMP_DIR,
+                output_dir=temp_dir,
                 adult_filter_off=True,
                 force_replace=False,
                 timeout=60,
                 verbose=False
             )
 
-            query_folder = os.path.join(TEMP_DIR, description)
+            query_folder = os.path.join(temp_dir, description)
             if not os.path.exists(query_folder):
                 logger.error("No images downloaded from Bing.")
                 return "Image generation failed: No results found."
@@ -210,31 +336,24 @@ class Orchestrator:
                     img = Image.open(io.BytesIO(img_bytes))
                     img.verify()
 
-                    final_path = os.path.join(
-                        IMAGES_DIR,
-                        f"image_{placeholder_idx}.png"
-                    )
-
-                    with open(final_path, "wb") as f:
-                        f.write(img_bytes)
+                    final_path = Orchestrator.save_image(img_bytes, final_stem)
 
                     logger.info(f"Image saved to {final_path}")
-
-                    shutil.rmtree(TEMP_DIR, ignore_errors=True)
                     return f"Image saved to {final_path}"
 
                 except Exception:
                     logger.warning(f"Invalid image file skipped: {file}")
                     continue
 
-            shutil.rmtree(TEMP_DIR, ignore_errors=True)
             return "Image generation failed: No valid images."
 
         except Exception as e:
             logger.error(f"Bing image download error: {e}")
-            shutil.rmtree(TEMP_DIR, ignore_errors=True)
             return "Image generation failed due to an error."
 
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
     @staticmethod
     @tool
     def audio_generation_tool(mode: str) -> str:    
@@ -245,7 +364,7 @@ class Orchestrator:
         Returns:
             str: Status message indicating completion of audio generation.
         """
-        audio_agent = AudioAgent()
+        audio_agent = get_audio_agent()
         initial_state = {
             "transcript": [],
             "mode": mode,
@@ -269,7 +388,226 @@ class Orchestrator:
             "messages": state.get("messages", []) + [response],
         }
     
-    def process_markdown_files(self, unprocessed_markdown: str, query: str) -> str:
+    @staticmethod
+    def placeholder_folder(placeholder: dict, processed_dir: str) -> Path:
+        folders = {"graph": "graphs", "mermaid": "mermaid", "image": "images"}
+        return Path(processed_dir) / folders[placeholder["type"]]
+
+    @staticmethod
+    def placeholder_files(placeholder: dict, processed_dir: str) -> List[Path]:
+        """
+        Every file a placeholder has on disk: the artifact itself plus, for images,
+        its responsive variants (`image_<idx>_<width>w<ext>`).
+        """
+        folder = Orchestrator.placeholder_folder(placeholder, processed_dir)
+        if not folder.exists():
+            return []
+        stem = f"{placeholder['type']}_{placeholder['idx']}"
+        pattern = re.compile(rf"{re.escape(stem)}(_\d+w)?\.\w+")
+        return [path for path in folder.iterdir() if pattern.fullmatch(path.name)]
+
+    @staticmethod
+    def placeholder_output_path(placeholder: dict, processed_dir: str) -> Path:
+        """
+        The artifact file of a placeholder. Images keep the extension of the format they
+        were normalized to, so an existing file wins over the default `.png` name.
+        """
+        default = Orchestrator.placeholder_folder(placeholder, processed_dir) / f"{placeholder['type']}_{placeholder['idx']}.png"
+        for path in Orchestrator.placeholder_files(placeholder, processed_dir):
+            if path.stem == default.stem:
+                return path
+        return default
+
+    def _cached_placeholder(self, tool, processed_dir: str, placeholder: dict, cancelled: threading.Event) -> tuple:
+        """
+        Serves a placeholder from the artifact cache, or runs the tool and caches its output.
+        The tool writes into a private staging directory whose files are moved into
+        `processed_dir` once it succeeded, so concurrent requests for the same query never
+        delete or overwrite each other's artifacts and a failed run leaves nothing behind.
+        Returns:
+            tuple: (status, output). The status is "ok" when the artifact file was written,
+            "cancelled" when the placeholder timed out meanwhile, "failed" otherwise.
+        """
+        os.makedirs(processed_dir, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(prefix=".staging_", dir=processed_dir)
+        try:
+            self.placeholder_folder(placeholder, staging_dir).mkdir(parents=True)
+            status, output = self._generate_placeholder(tool, staging_dir, placeholder, cancelled)
+            if status == "ok" and not self._publish_placeholder(placeholder, staging_dir, processed_dir, cancelled):
+                # Its result was already reported as a timeout; a late file must not show up afterwards
+                status = "cancelled"
+            return status, output
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _generate_placeholder(self, tool, staging_dir: str, placeholder: dict, cancelled: threading.Event) -> tuple:
+        if self.artifact_cache.config.enabled:
+            cached = self.artifact_cache.lookup(placeholder["type"], placeholder["description"])
+            if cached is not None:
+                output_path = self.placeholder_output_path(placeholder, staging_dir).with_suffix(cached.suffix)
+                self.artifact_cache.materialize(cached, output_path)
+                self.artifact_cache.materialize_extras(cached, output_path)
+                logger.info(f"Placeholder {placeholder['idx']} served from artifact cache: {cached}")
+                return "ok", f"Restored from cache as {output_path.name}"
+
+        output = tool(placeholder, cancelled, staging_dir)
+        status = self._placeholder_status(placeholder, staging_dir, cancelled)
+        if status == "ok" and self.artifact_cache.config.enabled:
+            output_path = self.placeholder_output_path(placeholder, staging_dir)
+            # Image size variants are cached with the image, so a hit restores them too
+            variants = [path for path in self.placeholder_files(placeholder, staging_dir) if path != output_path]
+            self.artifact_cache.store(placeholder["type"], placeholder["description"], output_path, extras=variants)
+        return status, output
+
+    def _placeholder_status(self, placeholder: dict, processed_dir: str, cancelled: threading.Event) -> str:
+        if cancelled.is_set():
+            return "cancelled"
+        return "ok" if self.placeholder_output_path(placeholder, processed_dir).exists() else "failed"
+
+    @classmethod
+    def _publish_placeholder(cls, placeholder: dict, staging_dir: str, processed_dir: str, cancelled: threading.Event) -> bool:
+        """
+        Moves a placeholder's staged files into `processed_dir`, replacing the ones of
+        earlier runs. Returns False, without moving anything, once `cancelled` is set.
+        """
+        folder = cls.placeholder_folder(placeholder, processed_dir)
+        folder.mkdir(parents=True, exist_ok=True)
+        key = str(folder.resolve() / f"{placeholder['type']}_{placeholder['idx']}")
+        with cls.publish_locks_lock:
+            lock = cls.publish_locks.setdefault(key, threading.Lock())
+
+        with lock:
+            if cancelled.is_set():
+                return False
+            staged = cls.placeholder_files(placeholder, staging_dir)
+            names = {path.name for path in staged}
+            # A file with another extension or a variant width from an earlier run must not be served
+            for stale in cls.placeholder_files(placeholder, processed_dir):
+                if stale.name not in names:
+                    stale.unlink(missing_ok=True)
+            for path in staged:
+                os.replace(path, folder / path.name)
+        return True
+
+    @staticmethod
+    def _event_writer() -> Callable[[dict], None]:
+        """
+        Returns the LangGraph custom stream writer, or a no-op when called outside a graph run.
+        Events reach clients that stream the workflow with `stream_mode="custom"`.
+        """
+        try:
+            return get_stream_writer()
+        except RuntimeError:
+            return lambda event: None
+
+    def placeholder_handlers(self, query: str, batches: Optional[dict] = None) -> dict:
+        """
+        Builds the cached per-type handlers for the PlaceholderExecutor. `batches` maps a
+        placeholder index to the future of the batched code generation call that covers it
+        (see submit_batched); it may keep growing while the handlers run.
+        """
+        processed_dir = f"./artifacts/processed_files/{sanitze_filename(query)}"
+        batches = batches if batches is not None else {}
+
+        def batched_code(p: dict) -> Optional[str]:
+            # Batched placeholders are only started once their batch has resolved, so this does not wait
+            batch = batches.get(p["idx"])
+            return batch.result().get(p["idx"]) if batch else None
+
+        # Tools write below the staging directory `output_dir` handed in by _cached_placeholder
+        def graph_tool(p: dict, cancelled: threading.Event, output_dir: str) -> str:
+            # Batched code runs in the warm plotting pool; only plots that fail go through fix_code.
+            # Its savefig path is rewritten to the staging directory by the plot code check
+            code = batched_code(p) or ""
+            return self.run_graph_workflow(p["description"], str(p["idx"]), f"{output_dir}/graphs/", extracted_code=code, cancelled=cancelled)
+
+        def mermaid_tool(p: dict, cancelled: threading.Event, output_dir: str) -> str:
+            code = batched_code(p)
+            if cancelled.is_set():
+                return "Mermaid generation cancelled."
+            if code is None:
+                return self.mermaid_generation_tool(p["description"], p["idx"], f"{output_dir}/mermaid/")
+            return self.render_mermaid_code(code, p["description"], p["idx"], f"{output_dir}/mermaid/")
+
+        tools = {
+            "graph": graph_tool,
+            "mermaid": mermaid_tool,
+            "image": lambda p, cancelled, output_dir: self.image_generation_tool(p["description"], query, p["idx"], cancelled, output_dir),
+        }
+        return {
+            placeholder_type: partial(self._cached_placeholder, tool, processed_dir)
+            for placeholder_type, tool in tools.items()
+        }
+
+    def run_placeholders(self, extracted_placeholder: List[dict], query: str, on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """
+        Generates every placeholder concurrently and waits for all of them.
+        Args:
+            extracted_placeholder (list[dict]): Placeholders with `type`, `idx` and `description`.
+            query (str): User query (used for folder naming).
+            on_result (Callable): Optional callback invoked as each placeholder finishes.
+        Returns:
+            list[dict]: One result per placeholder, ordered by placeholder index.
+        """
+        batch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="placeholder-batch")
+        batches = {}
+        executor = PlaceholderExecutor(self.placeholder_handlers(query, batches))
+        try:
+            for placeholder in extracted_placeholder:
+                logger.info(f"Processing placeholder: {placeholder}")
+            self.submit_batched(executor, batch_pool, extracted_placeholder, query, batches)
+            return executor.wait_all(on_result)
+        finally:
+            executor.shutdown()
+            batch_pool.shutdown(wait=False)
+
+    def submit_batched(self, executor: PlaceholderExecutor, batch_pool: ThreadPoolExecutor, placeholders: List[dict], query: str, batches: dict) -> None:
+        """
+        Submits placeholders to the executor. The code of the mermaid and of the graph
+        placeholders comes from one batched LLM call per type, running alongside the other
+        placeholders; each batch future is recorded in `batches` under the indices it covers.
+        Placeholders are held back until their batch resolves, so they neither occupy an
+        executor slot while waiting nor spend their timeout on the batch call.
+        """
+        processed_dir = f"./artifacts/processed_files/{sanitze_filename(query)}"
+        pregenerate = {
+            "mermaid": lambda: self.pregenerate_mermaid(placeholders),
+            "graph": lambda: self.pregenerate_graphs(placeholders, f"{processed_dir}/graphs/"),
+        }
+        futures = {
+            placeholder_type: batch_pool.submit(generate)
+            for placeholder_type, generate in pregenerate.items()
+            if any(p["type"] == placeholder_type for p in placeholders)
+        }
+        for placeholder in placeholders:
+            batch = futures.get(placeholder["type"])
+            if batch is not None:
+                batches[placeholder["idx"]] = batch
+            executor.submit(placeholder, after=batch)
+
+    @staticmethod
+    def artifact_url(query: str, placeholder: dict, suffix: Optional[str] = None) -> str:
+        """
+        URL of a placeholder's artifact, mirroring its path under `./artifacts`. The suffix
+        defaults to that of the file on disk (see placeholder_output_path).
+        """
+        path = Orchestrator.placeholder_output_path(placeholder, f"./artifacts/processed_files/{sanitze_filename(query)}")
+        if suffix is not None:
+            path = path.with_suffix(suffix)
+        return f"/{path.as_posix()}"
+
+    @staticmethod
+    def artifact_urls(query: str, placeholder: dict) -> List[str]:
+        """URLs of every file of a placeholder, including responsive image variants."""
+        processed_dir = f"./artifacts/processed_files/{sanitze_filename(query)}"
+        return [f"/{path.as_posix()}" for path in Orchestrator.placeholder_files(placeholder, processed_dir)]
+
+    def prepare_document(self, unprocessed_markdown: str, query: str) -> tuple:
+        """
+        Replaces every placeholder with its image link and publishes the lesson text.
+        Returns:
+            tuple: (processed markdown, extracted placeholders, output directory)
+        """
         ROOT_DIR = "./artifacts/processed_files/"
 
         if not os.path.exists(ROOT_DIR):
@@ -277,9 +615,7 @@ class Orchestrator:
         
         os.makedirs(os.path.join(ROOT_DIR, sanitze_filename(query)), exist_ok=True)
 
-        pattern = re.compile(r"<\s*(graph|image|mermaid)\s*:\s*([^>]+?)\s*>", re.IGNORECASE)
-
-        matches = list(pattern.finditer(unprocessed_markdown))
+        matches = list(PLACEHOLDER_PATTERN.finditer(unprocessed_markdown))
 
         print(len(matches), "placeholders found.")
 
@@ -293,51 +629,205 @@ class Orchestrator:
         for idx, m in enumerate(matches):
             matched_text = m.group(0)
             logger.info(f"Placeholder {idx}: {matched_text[:20]}")
-            placeholder_type = m.group(1).lower()
-            processed_markdown = processed_markdown.replace(matched_text, f"![{sanitze_filename(m.group(2).strip())}](/artifacts/processed_files/{sanitze_filename(query)}/{placeholder_type}s/{placeholder_type}_{idx}.png)\n")
-            extracted_placeholder.append({
-                "type": placeholder_type,
+            placeholder = {
+                "type": m.group(1).lower(),
                 "idx": idx,
                 "description": m.group(2).strip(),
-            })
+            }
+            processed_markdown = processed_markdown.replace(matched_text, f"![{sanitze_filename(placeholder['description'])}]({self.artifact_url(query, placeholder, '.png')})\n")
+            extracted_placeholder.append(placeholder)
 
         
         with open(os.path.join(dir_path, "extracted_placeholders.json"), "w") as f:
             json.dump(extracted_placeholder, f, indent=4)
 
-        for placeholder in extracted_placeholder:
-            logger.info(f"Processing placeholder: {placeholder}")
-            if placeholder["type"] == "graph":
-                self.graph_tool(placeholder["description"], placeholder['idx'], f"./artifacts/processed_files/{sanitze_filename(query)}/graphs/")
-            elif placeholder["type"] == "mermaid":
-                self.mermaid_generation_tool(placeholder["description"], placeholder['idx'], f"./artifacts/processed_files/{sanitze_filename(query)}/mermaid/")
-            elif placeholder["type"] == "image":
-                if "Image generation failed: No results found." == self.image_generation_tool(placeholder["description"], query, placeholder['idx']):
-                    processed_markdown = processed_markdown.replace(f"![{sanitze_filename(placeholder['description'])}](/artifacts/processed_files/{sanitze_filename(query)}/images/image_{placeholder['idx']}.png)\n", "")
-                    logger.error(f"No image results found for placeholder: {placeholder}")
+        # Publish the lesson text first so clients can render it while media is generated
+        with open(os.path.join(dir_path, "processed_document.md"), "w") as f:
+            f.write(processed_markdown)
+
+        self._event_writer()({
+            "type": "markdown_ready",
+            "markdown": processed_markdown,
+            "placeholders": extracted_placeholder,
+        })
+        return processed_markdown, extracted_placeholder, dir_path
+
+    def result_emitter(self, query: str, dir_path: str) -> Callable[[dict], None]:
+        """Returns the on_result callback that streams each finished placeholder to clients."""
+        emit = self._event_writer()
+
+        def on_result(result: dict) -> None:
+            emit({
+                "type": "placeholder",
+                "placeholder_type": result["type"],
+                "idx": result["idx"],
+                "status": result["status"],
+                "elapsed": result["elapsed"],
+                "url": self.artifact_url(query, result),
+                # Every file of the placeholder, so it can be published as soon as it is ready
+                "files": self.artifact_urls(query, result) if result["status"] == "ok" else [],
+            })
+
+        return on_result
+
+    def finalize_document(self, processed_markdown: str, results: List[dict], query: str, dir_path: str) -> str:
+        """
+        Patches image links with the outcome of their placeholders and publishes the final document.
+        """
+        for result in results:
+            if result["type"] != "image":
+                continue
+            link = f"![{sanitze_filename(result['description'])}]({self.artifact_url(query, result, '.png')})\n"
+            if result["output"] == "Image generation failed: No results found.":
+                processed_markdown = processed_markdown.replace(link, "")
+                logger.error(f"No image results found for placeholder: {result}")
+                continue
+            # Normalized images may have been written as .jpg/.webp rather than .png
+            suffix = self.placeholder_output_path(result, dir_path).suffix
+            if suffix != ".png":
+                processed_markdown = processed_markdown.replace(link, link.replace(self.artifact_url(query, result, ".png"), self.artifact_url(query, result, suffix)))
             
         with open(os.path.join(dir_path, "processed_document.md"), "w") as f:
             f.write(processed_markdown)
+
+        self._event_writer()({"type": "document_ready", "markdown": processed_markdown})
         return processed_markdown
-    
-    def process_placeholder(self, state: OrchestratorState) -> OrchestratorState:
-        prompt_template = PromptTemplate(input_variables=["messages", "document"], template=MARKDOWN_AGENT_PROMPT)
-        orchestrator = prompt_template | self.model
-        response = orchestrator.invoke({"messages": state.get("messages", []), "document": state.get("summarized_rag_content", "")})
 
-        markdown_document = response.content.replace("```markdown", "").replace("```", "").strip()
-        
+    def process_markdown_files(self, unprocessed_markdown: str, query: str) -> str:
+        processed_markdown, extracted_placeholder, dir_path = self.prepare_document(unprocessed_markdown, query)
+        results = self.run_placeholders(extracted_placeholder, query, on_result=self.result_emitter(query, dir_path))
+        return self.finalize_document(processed_markdown, results, query, dir_path)
+
+    @staticmethod
+    def save_markdown_document(markdown_document: str) -> None:
         output_path = "./artifacts/markdown/generated_document.md"
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         with open(output_path, "w") as f:
             f.write(markdown_document)
 
+    def process_placeholder(self, state: OrchestratorState) -> OrchestratorState:
+        if self.executor_config.stream_markdown:
+            return self.process_placeholder_streaming(state)
+
+        prompt_template = PromptTemplate(input_variables=["messages", "document"], template=MARKDOWN_AGENT_PROMPT)
+        orchestrator = prompt_template | self.model
+        response = orchestrator.invoke({"messages": state.get("messages", []), "document": state.get("summarized_rag_content", "")})
+
+        markdown_document = clean_markdown(response.content)
+        self.save_markdown_document(markdown_document)
+
         self.process_markdown_files(markdown_document, state["messages"][0].content)
 
         return {
             "messages": state.get("messages", []) + [response],
             "markdown_document": markdown_document,
         }
+
+    @staticmethod
+    def markdown_messages(state: OrchestratorState) -> List[BaseMessage]:
+        prompt_template = PromptTemplate(input_variables=["messages", "document"], template=MARKDOWN_AGENT_PROMPT)
+        return prompt_template.invoke({"messages": state.get("messages", []), "document": state.get("summarized_rag_content", "")}).to_messages()
+
+    def stream_cache_key(self) -> str:
+        """Response cache `llm_string` of streamed answers, built from the model's public settings."""
+        params = {name: getattr(self.model, name, None) for name in ("model", "temperature", "top_p", "top_k", "max_output_tokens")}
+        return f"stream:{type(self.model).__name__}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def stream_markdown_response(self, state: OrchestratorState) -> Iterator[BaseMessage]:
+        """
+        Streams the markdown agent's answer chunk by chunk. LangChain's stream() skips
+        the response cache, so it is consulted and filled here; a hit is yielded whole.
+        """
+        messages = self.markdown_messages(state)
+
+        cache = self.model.cache
+        if cache is not None:
+            prompt, llm_string = dumps(messages), self.stream_cache_key()
+            cached = cache.lookup(prompt, llm_string)
+            if cached:
+                yield cached[0].message
+                return
+
+        response = None
+        for chunk in self.model.stream(messages):
+            response = chunk if response is None else response + chunk
+            yield chunk
+
+        if cache is not None and response is not None:
+            cache.update(prompt, llm_string, [ChatGeneration(message=message_chunk_to_message(response))])
+
+    def process_placeholder_streaming(self, state: OrchestratorState) -> OrchestratorState:
+        """
+        Streaming variant of process_placeholder: placeholders are dispatched to the
+        executor as soon as their closing `>` arrives, so media generation overlaps with
+        the rest of the markdown being written. Mermaid and graph placeholders are held
+        for up to `stream_batch_delay` seconds so the ones arriving close together share
+        one batched code generation call.
+        """
+        query = state["messages"][0].content
+        parser = PlaceholderStreamParser()
+        batch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="placeholder-batch")
+        batches = {}
+        executor = PlaceholderExecutor(self.placeholder_handlers(query, batches))
+        held, held_since = [], None
+
+        def dispatch(placeholders: List[dict]) -> None:
+            nonlocal held_since
+            for placeholder in placeholders:
+                logger.info(f"Dispatching streamed placeholder: {placeholder}")
+                if placeholder["type"] in ("mermaid", "graph"):
+                    held.append(placeholder)
+                    held_since = held_since or time.monotonic()
+                else:
+                    executor.submit(placeholder)
+
+        def flush() -> None:
+            nonlocal held, held_since
+            if held:
+                self.submit_batched(executor, batch_pool, held, query, batches)
+            held, held_since = [], None
+
+        try:
+            response = None
+            for chunk in self.stream_markdown_response(state):
+                response = chunk if response is None else response + chunk
+                dispatch(parser.feed(chunk.content))
+                if held_since is not None and time.monotonic() - held_since >= self.executor_config.stream_batch_delay:
+                    flush()
+            dispatch(parser.close())
+            flush()
+
+            if response is None:
+                # Nothing was streamed; placeholders of the full answer are submitted below
+                logger.warning("Markdown stream returned no chunks, falling back to a non-streaming call")
+                response = self.model.invoke(self.markdown_messages(state))
+
+            markdown_document = clean_markdown(response.content)
+            self.save_markdown_document(markdown_document)
+
+            processed_markdown, extracted_placeholder, dir_path = self.prepare_document(markdown_document, query)
+            streamed = {p["idx"]: p for p in parser.placeholders}
+            for placeholder in extracted_placeholder:
+                # The parser mirrors the final regex scan; anything it missed still gets generated
+                if placeholder["idx"] not in streamed:
+                    logger.warning(f"Placeholder {placeholder['idx']} was not seen while streaming, submitting it now")
+                    executor.submit(placeholder)
+                elif streamed[placeholder["idx"]] != placeholder:
+                    logger.warning(f"Streamed placeholder {streamed[placeholder['idx']]} differs from the final document, regenerating it: {placeholder}")
+                    # Batched code was written for the streamed description
+                    batches.pop(placeholder["idx"], None)
+                    executor.replace(placeholder)
+
+            results = executor.wait_all(self.result_emitter(query, dir_path))
+            self.finalize_document(processed_markdown, results, query, dir_path)
+        finally:
+            executor.shutdown()
+            batch_pool.shutdown(wait=False)
+
+        return {
+            "messages": state.get("messages", []) + [response],
+            "markdown_document": markdown_document,
+        }
     
     def start(self, state: OrchestratorState) -> OrchestratorState:
         return state
@@ -365,7 +855,7 @@ class Orchestrator:
                 filename=filename
             )
 
-            if hasattr(docs[0], "page_content"):
+            if docs and hasattr(docs[0], "page_content"):
                 return [doc.page_content for doc in docs]
 
             return docs
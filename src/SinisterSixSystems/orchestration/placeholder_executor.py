@@ -0,0 +1,177 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import PlaceholderExecutorConfig
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+
+class PlaceholderExecutor:
+    """
+    Runs placeholder tools (graph / mermaid / image) on a bounded thread pool.
+
+    Every placeholder type has its own queue, concurrency limit and timeout. A
+    placeholder is only handed to the pool once its type has a free slot, so a
+    backlog of one type never occupies the threads the other types need. Results
+    are collected per placeholder index so the caller can patch the markdown in a
+    deterministic order once everything has finished.
+
+    A placeholder submitted with `after` waits outside the queue until that future
+    (e.g. a batched code generation call) has resolved, and its timeout only starts
+    once it runs.
+
+    Handlers are called as `handler(placeholder, cancelled)` and return a
+    `(status, output)` tuple. `cancelled` is a threading.Event that is set when the
+    placeholder times out; handlers check it between stages and stop early.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable[[dict, threading.Event], Tuple[str, str]]], config: Optional[PlaceholderExecutorConfig] = None):
+        self.handlers = handlers
+        self.config = config or PlaceholderExecutorConfig()
+        self.pool = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="placeholder")
+        self.lock = threading.Lock()
+        self.queues = {placeholder_type: deque() for placeholder_type in handlers}
+        self.running = {placeholder_type: 0 for placeholder_type in handlers}
+        self.pending = {}
+        # Latest submission per placeholder index, finished or not
+        self.futures = {}
+        self.started_at = {}
+        self.cancel_events = {}
+        self.results = {}
+        self.closed = False
+
+    def _run(self, placeholder: dict, future: Future) -> None:
+        self.started_at[placeholder["idx"]] = time.monotonic()
+        try:
+            future.set_result(self.handlers[placeholder["type"]](placeholder, self.cancel_events[placeholder["idx"]]))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.lock:
+                self.running[placeholder["type"]] -= 1
+            self._dispatch(placeholder["type"])
+
+    def _dispatch(self, placeholder_type: str) -> None:
+        """Hands queued placeholders of one type to the pool while the type has free slots."""
+        limit = self.config.concurrency_limits.get(placeholder_type, self.config.max_workers)
+        with self.lock:
+            queue = self.queues[placeholder_type]
+            while queue and self.running[placeholder_type] < limit:
+                placeholder, future = queue.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.running[placeholder_type] += 1
+                self.pool.submit(self._run, placeholder, future)
+
+    def _enqueue(self, placeholder: dict, future: Future) -> None:
+        with self.lock:
+            if self.closed:
+                future.cancel()
+                return
+            self.queues[placeholder["type"]].append((placeholder, future))
+        self._dispatch(placeholder["type"])
+
+    def submit(self, placeholder: dict, after: Optional[Future] = None) -> None:
+        """Queues a single placeholder for execution, once `after` has resolved if given."""
+        if placeholder["type"] not in self.handlers:
+            logger.warning(f"No handler registered for placeholder type: {placeholder['type']}")
+            self._record(placeholder, "failed", "Unsupported placeholder type.")
+            return
+
+        future = Future()
+        self.cancel_events[placeholder["idx"]] = threading.Event()
+        with self.lock:
+            self.pending[future] = placeholder
+            self.futures[placeholder["idx"]] = future
+        if after is None:
+            self._enqueue(placeholder, future)
+        else:
+            # Runs right away when `after` is already done, otherwise in the thread that resolves it
+            after.add_done_callback(lambda _: self._enqueue(placeholder, future))
+
+    def replace(self, placeholder: dict) -> None:
+        """
+        Cancels the submission with the same index and submits `placeholder` instead. The
+        new one only starts after the previous handler has stopped, as both write the same files.
+        """
+        idx = placeholder["idx"]
+        with self.lock:
+            previous = self.futures.get(idx)
+            self.pending.pop(previous, None)
+            self.started_at.pop(idx, None)
+        if previous is not None:
+            self.cancel_events[idx].set()
+            # Only succeeds while it is still waiting; a running handler stops at its next stage
+            previous.cancel()
+        self.submit(placeholder, after=previous)
+
+    def _record(self, placeholder: dict, status: str, output: str) -> dict:
+        started = self.started_at.get(placeholder["idx"])
+        result = {
+            **placeholder,
+            "status": status,
+            "output": output,
+            "elapsed": round(time.monotonic() - started, 3) if started else 0.0,
+        }
+        self.results[placeholder["idx"]] = result
+        logger.info(f"Placeholder {placeholder['idx']} ({placeholder['type']}) finished with status '{status}' in {result['elapsed']}s")
+        return result
+
+    def _collect_timeouts(self, on_result: Optional[Callable[[dict], None]]) -> None:
+        now = time.monotonic()
+        for future, placeholder in list(self.pending.items()):
+            started = self.started_at.get(placeholder["idx"])
+            timeout = self.config.timeouts.get(placeholder["type"])
+            if started is None or timeout is None or now - started <= timeout:
+                continue
+
+            # Worker threads cannot be interrupted; the handler sees the flag and stops at its next stage
+            self.cancel_events[placeholder["idx"]].set()
+            with self.lock:
+                del self.pending[future]
+            result = self._record(placeholder, "timeout", f"Placeholder timed out after {timeout}s.")
+            if on_result:
+                on_result(result)
+
+    def wait_all(self, on_result: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """
+        Blocks until every submitted placeholder has finished or timed out.
+
+        Args:
+            on_result: Optional callback invoked (in the calling thread) as each result lands.
+        Returns:
+            list[dict]: Results ordered by placeholder index.
+        """
+        while self.pending:
+            done, _ = wait(list(self.pending), timeout=self.config.poll_interval, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                with self.lock:
+                    placeholder = self.pending.pop(future, None)
+                if placeholder is None:
+                    continue
+                try:
+                    status, output = future.result()
+                    result = self._record(placeholder, status, output)
+                except Exception as e:
+                    logger.error(f"Placeholder {placeholder['idx']} raised an error: {e}")
+                    result = self._record(placeholder, "failed", str(e))
+                if on_result:
+                    on_result(result)
+
+            self._collect_timeouts(on_result)
+
+        return [self.results[idx] for idx in sorted(self.results)]
+
+    def shutdown(self) -> None:
+        for cancelled in self.cancel_events.values():
+            cancelled.set()
+        with self.lock:
+            self.closed = True
+            for queue in self.queues.values():
+                for _, future in queue:
+                    future.cancel()
+                queue.clear()
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,83 @@
+from typing import List
+import re
+
+
+PLACEHOLDER_PATTERN = re.compile(r"<\s*(graph|image|mermaid)\s*:\s*([^>]+?)\s*>", re.IGNORECASE)
+FENCE_TOKENS = ("```markdown", "```")
+
+
+def clean_markdown(text: str) -> str:
+    """Strips the code fences the markdown agent tends to wrap its answer in."""
+    for token in FENCE_TOKENS:
+        text = text.replace(token, "")
+    return text.strip()
+
+
+class PlaceholderStreamParser:
+    """
+    Incrementally finds `<graph|image|mermaid: ...>` placeholders in a token stream.
+
+    A placeholder is reported as soon as its closing `>` arrives. Indices follow the
+    order of `PLACEHOLDER_PATTERN.finditer` over the finished, cleaned document, so
+    the placeholders dispatched while streaming line up with the links written later.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.scan_pos = 0
+        self.placeholders: List[dict] = []
+
+    @staticmethod
+    def _held_back(raw: str) -> int:
+        """
+        Length of the tail whose fence removal is not settled yet: a trailing run of
+        backticks, plus a partial `markdown` right after one.
+        """
+        end = len(raw)
+        word = FENCE_TOKENS[0].lstrip("`")
+        for length in range(min(len(word) - 1, len(raw)), 0, -1):
+            if word.startswith(raw[-length:]) and raw[:-length].endswith("`"):
+                end -= length
+                break
+        while end > 0 and raw[end - 1] == "`":
+            end -= 1
+        return len(raw) - end
+
+    def _scan(self, text: str) -> List[dict]:
+        found = []
+        for match in PLACEHOLDER_PATTERN.finditer(text, self.scan_pos):
+            placeholder = {
+                "type": match.group(1).lower(),
+                "idx": len(self.placeholders),
+                "description": match.group(2).strip(),
+            }
+            self.placeholders.append(placeholder)
+            found.append(placeholder)
+            self.scan_pos = match.end()
+
+        # A '<' after the last '>' may still open a placeholder; everything before it is settled
+        tail_start = max(self.scan_pos, text.rfind(">") + 1)
+        pending = text.find("<", tail_start)
+        self.scan_pos = pending if pending != -1 else len(text)
+        return found
+
+    def feed(self, chunk: str) -> List[dict]:
+        """
+        Adds streamed text and returns the placeholders it completed.
+        """
+        self.raw += chunk
+        held = self._held_back(self.raw)
+        settled = self.raw[:len(self.raw) - held]
+        # Fences are removed before scanning, as they are from the final document
+        for token in FENCE_TOKENS:
+            settled = settled.replace(token, "")
+        return self._scan(settled)
+
+    def close(self) -> List[dict]:
+        """
+        Flushes the held-back tail once the stream has ended.
+        """
+        text = self.raw
+        for token in FENCE_TOKENS:
+            text = text.replace(token, "")
+        return self._scan(text)
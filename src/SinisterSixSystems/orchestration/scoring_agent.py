@@ -1,8 +1,8 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from SinisterSixSystems.utils.registry import get_chat_model
 
 def scoring_node(state):
     print(f"📍 [DEBUG] Entered Scoring Agent (Attempt {state.get('retry_count', 0) + 1})")
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+    llm = get_chat_model("scoring")
     
     content = state.get("text_content", "")
     
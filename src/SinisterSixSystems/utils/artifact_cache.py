@@ -0,0 +1,217 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import ArtifactCacheConfig, GraphRenderCacheConfig
+
+from pathlib import Path
+from typing import List, Optional, Sequence
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+
+class ArtifactCache:
+    """
+    On-disk content-addressed cache for rendered artifacts (graphs, diagrams, images).
+
+    Entries are keyed by a hash of the placeholder type, the normalized description
+    and the configured model/prompt version. Hits are hard-linked (or copied) into
+    the destination folder. The cache is bounded by total size and evicts the least
+    recently used files first. An entry may carry extra files (e.g. the size
+    variants of an image), stored as `<key><suffix>` next to the main file.
+    """
+
+    def __init__(self, config: Optional[ArtifactCacheConfig] = None):
+        self.config = config or ArtifactCacheConfig()
+        self.root = Path(self.config.root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize(description: str) -> str:
+        description = description.strip().strip("`'\"").lower()
+        description = re.sub(r"\s+", " ", description)
+        return description.rstrip(" .")
+
+    def key(self, kind: str, description: str) -> str:
+        raw = "\0".join([self.config.version, kind.lower(), self.normalize(description)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.root / key[:2]
+
+    def _find(self, key: str) -> Optional[Path]:
+        entry_dir = self._entry_dir(key)
+        if not entry_dir.exists():
+            return None
+        for candidate in entry_dir.glob(f"{key}.*"):
+            if not candidate.name.endswith(".tmp"):
+                return candidate
+        return None
+
+    @staticmethod
+    def extras(cached: Path) -> List[Path]:
+        """Extra files stored with a cached entry, named `<key><suffix>`."""
+        key = cached.name.split(".", 1)[0]
+        return [path for path in cached.parent.glob(f"{key}_*") if not path.name.endswith(".tmp")]
+
+    def _count(self, counter: str) -> None:
+        with self.lock:
+            self.counters[counter] += 1
+
+    def lookup(self, kind: str, description: str) -> Optional[Path]:
+        """
+        Returns the cached file for a placeholder, or None on a miss.
+        """
+        cached = self._find(self.key(kind, description))
+        if cached is None:
+            self._count("misses")
+            return None
+
+        try:
+            # mtime doubles as the LRU timestamp; extras are touched too so they are evicted with their entry
+            for path in [cached] + self.extras(cached):
+                os.utime(path)
+        except OSError:
+            pass
+        self._count("hits")
+        return cached
+
+    def contains(self, kind: str, description: str) -> bool:
+        """Whether a placeholder is cached, without counting a lookup or refreshing its LRU time."""
+        return self._find(self.key(kind, description)) is not None
+
+    @staticmethod
+    def materialize(cached: Path, destination: Path) -> Path:
+        """
+        Places a cached file at `destination`, hard-linking when possible.
+        """
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if destination.exists():
+            destination.unlink()
+        try:
+            os.link(cached, destination)
+        except OSError:
+            shutil.copy2(cached, destination)
+        return destination
+
+    @staticmethod
+    def materialize_extras(cached: Path, destination: Path) -> List[Path]:
+        """Places the extra files of a cached entry next to `destination`, keeping their suffixes."""
+        destination = Path(destination)
+        key = cached.name.split(".", 1)[0]
+        return [
+            ArtifactCache.materialize(extra, destination.with_name(destination.stem + extra.name[len(key):]))
+            for extra in ArtifactCache.extras(cached)
+        ]
+
+    @staticmethod
+    def _copy_atomic(source: Path, target: Path) -> bool:
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not store artifact in cache: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def store(self, kind: str, description: str, source: Path, extras: Sequence[Path] = ()) -> Optional[Path]:
+        """
+        Copies a freshly rendered file into the cache. `extras` are files named
+        `<source stem><suffix>` that are stored with it and restored by `materialize_extras`.
+        """
+        source = Path(source)
+        if not source.exists() or source.stat().st_size == 0:
+            return None
+
+        key = self.key(kind, description)
+        entry_dir = self._entry_dir(key)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        target = entry_dir / f"{key}{source.suffix}"
+        if not self._copy_atomic(source, target):
+            return None
+
+        stored = {target}
+        for extra in map(Path, extras):
+            extra_target = entry_dir / f"{key}{extra.name[len(source.stem):]}"
+            if self._copy_atomic(extra, extra_target):
+                stored.add(extra_target)
+
+        # An entry re-rendered in another format (e.g. a normalized .jpg replacing a .png) must not shadow the new one
+        for stale in [*entry_dir.glob(f"{key}.*"), *self.extras(target)]:
+            if stale not in stored and not stale.name.endswith(".tmp"):
+                stale.unlink(missing_ok=True)
+
+        self._count("stores")
+        self.evict()
+        return target
+
+    def evict(self) -> None:
+        """Removes least recently used entries until the cache fits in `max_bytes`."""
+        with self.lock:
+            entries = []
+            for path in self.root.glob("*/*"):
+                if path.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.config.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                    self.counters["evictions"] += 1
+                except OSError:
+                    continue
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+        files = [path for path in self.root.glob("*/*") if not path.name.endswith(".tmp")]
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": len(files),
+            "bytes": sum(path.stat().st_size for path in files if path.exists()),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """Returns the process-wide placeholder artifact cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ArtifactCache()
+    return _cache
+
+
+_graph_cache = None
+
+
+def get_graph_render_cache() -> ArtifactCache:
+    """Returns the process-wide cache of rendered graphs keyed by normalized plotting code."""
+    global _graph_cache
+    if _graph_cache is None:
+        with _cache_lock:
+            if _graph_cache is None:
+                _graph_cache = ArtifactCache(GraphRenderCacheConfig())
+    return _graph_cache
@@ -0,0 +1,187 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import ImageFetcherConfig
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import quote_plus
+from PIL import Image
+import html
+import io
+import os
+import re
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+BING_ASYNC_URL = "https://www.bing.com/images/async?q={query}&first=0&count={count}&adlt=off"
+MURL_PATTERN = re.compile(r'"murl":"(.*?)"')
+CHUNK_SIZE = 64 * 1024
+# Enough bytes for Pillow to read the header (format and dimensions) of common formats
+HEADER_PROBE_BYTES = 32 * 1024
+
+
+class ImageRejected(Exception):
+    """A candidate that downloaded but failed validation."""
+
+
+class ImageFetcher:
+    """
+    Finds an image for a description with as little wasted transfer as possible.
+
+    Candidate URLs come from Bing's image search. They are downloaded concurrently
+    over one pooled HTTP session and validated while they stream in (content type,
+    byte size, dimensions from the header, full decode at the end). The first
+    candidate that passes wins and every other download is cancelled.
+    """
+
+    def __init__(self, config: Optional[ImageFetcherConfig] = None):
+        self.config = config or ImageFetcherConfig()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.config.max_workers, pool_maxsize=self.config.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": self.config.user_agent})
+
+    def search(self, description: str) -> List[str]:
+        """
+        Returns candidate image URLs for a description, best match first.
+        """
+        url = BING_ASYNC_URL.format(query=quote_plus(description), count=self.config.max_candidates)
+        response = self.session.get(url, timeout=self.config.search_timeout)
+        response.raise_for_status()
+
+        urls = []
+        for match in MURL_PATTERN.finditer(html.unescape(response.text)):
+            candidate = match.group(1)
+            if candidate.startswith(("http://", "https://")) and candidate not in urls:
+                urls.append(candidate)
+        return urls[:self.config.max_candidates]
+
+    def _check_dimensions(self, image: Image.Image) -> None:
+        width, height = image.size
+        if min(width, height) < self.config.min_dimension:
+            raise ImageRejected(f"too small ({width}x{height})")
+        if width * height > self.config.max_pixels:
+            raise ImageRejected(f"too many pixels ({width}x{height})")
+
+    def _download(self, url: str, cancelled: threading.Event) -> Optional[bytes]:
+        """
+        Streams one candidate, rejecting it as early as possible.
+
+        Returns:
+            bytes | None: The validated image, or None if the fetch was cancelled.
+        Raises:
+            ImageRejected / requests.RequestException: If the candidate is unusable.
+        """
+        timeout = (self.config.connect_timeout, self.config.read_timeout)
+        with self.session.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if not content_type.startswith("image/"):
+                raise ImageRejected(f"content type {content_type!r}")
+            declared = int(response.headers.get("Content-Length") or 0)
+            if declared > self.config.max_bytes:
+                raise ImageRejected(f"declared size {declared} bytes")
+
+            buffer = io.BytesIO()
+            header_checked = False
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if cancelled.is_set():
+                    return None
+                buffer.write(chunk)
+                if buffer.tell() > self.config.max_bytes:
+                    raise ImageRejected(f"larger than {self.config.max_bytes} bytes")
+                if not header_checked and buffer.tell() >= HEADER_PROBE_BYTES:
+                    try:
+                        # Dimensions are in the header, so oversized or tiny images stop downloading here
+                        self._check_dimensions(Image.open(io.BytesIO(buffer.getvalue())))
+                        header_checked = True
+                    except ImageRejected:
+                        raise
+                    except Exception:
+                        pass
+
+        data = buffer.getvalue()
+        try:
+            image = Image.open(io.BytesIO(data))
+            self._check_dimensions(image)
+            image.verify()
+        except ImageRejected:
+            raise
+        except Exception as e:
+            raise ImageRejected(f"not a valid image ({e})")
+        return data
+
+    def fetch_bytes(self, description: str) -> Optional[bytes]:
+        """
+        Returns the first acceptable image for a description, held in memory.
+
+        Returns:
+            bytes | None: The image, or None if no candidate was acceptable.
+        """
+        urls = self.search(description)
+        if not urls:
+            logger.warning(f"No image candidates found for: {description[:100]}")
+            return None
+
+        cancelled = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=min(self.config.max_workers, len(urls)), thread_name_prefix="image-fetch")
+        try:
+            futures = {pool.submit(self._download, url, cancelled): url for url in urls}
+            for future in as_completed(futures):
+                try:
+                    data = future.result()
+                except Exception as e:
+                    logger.warning(f"Image candidate rejected ({futures[future][:100]}): {e}")
+                    continue
+                if data is None:
+                    continue
+
+                # First valid image wins; queued candidates never start and running ones stop at the next chunk
+                cancelled.set()
+                for pending in futures:
+                    pending.cancel()
+                logger.info(f"Image fetched from {futures[future][:100]} ({len(data)} bytes)")
+                return data
+        finally:
+            cancelled.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        logger.warning(f"No valid image among {len(urls)} candidates for: {description[:100]}")
+        return None
+
+    def fetch(self, description: str, destination: Path) -> Optional[Path]:
+        """
+        Downloads the first acceptable image for a description to `destination` as is.
+
+        Returns:
+            Path | None: The written file, or None if no candidate was acceptable.
+        """
+        data = self.fetch_bytes(description)
+        if data is None:
+            return None
+
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = destination.with_name(f".{destination.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, destination)
+        return destination
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_image_fetcher() -> ImageFetcher:
+    """Returns the process-wide image fetcher, whose HTTP connection pool is shared by all placeholders."""
+    global _fetcher
+    if _fetcher is None:
+        with _fetcher_lock:
+            if _fetcher is None:
+                _fetcher = ImageFetcher()
+    return _fetcher
@@ -0,0 +1,108 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import ImageNormalizeConfig
+
+from pathlib import Path
+from typing import List, Optional
+from PIL import Image, ImageOps
+import io
+import os
+import threading
+
+
+EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+# Images with at most this many distinct colors (diagrams, icons) compress better losslessly
+PALETTE_COLORS = 256
+
+
+class NormalizedImage:
+    def __init__(self, path: Path, format: str, size: tuple, variants: List[Path]):
+        self.path = path
+        self.format = format
+        self.size = size
+        self.variants = variants
+
+
+def _choose_format(image: Image.Image, config: ImageNormalizeConfig) -> str:
+    if config.format != "auto":
+        return config.format.upper().replace("JPG", "JPEG")
+    if image.mode in ("RGBA", "LA") and image.getextrema()[-1][0] < 255:
+        return "PNG"
+    # getcolors returns None once the image has more distinct colors than the limit
+    if image.convert("RGB").getcolors(PALETTE_COLORS) is not None:
+        return "PNG"
+    return "JPEG"
+
+
+def _encode(image: Image.Image, format: str, config: ImageNormalizeConfig) -> bytes:
+    buffer = io.BytesIO()
+    if format == "JPEG":
+        image.convert("RGB").save(buffer, "JPEG", quality=config.jpeg_quality, optimize=True, progressive=True)
+    elif format == "WEBP":
+        image.save(buffer, "WEBP", quality=config.webp_quality, method=4)
+    else:
+        image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def normalize_image(data: bytes, destination_stem: Path, config: Optional[ImageNormalizeConfig] = None) -> NormalizedImage:
+    """
+    Decodes downloaded image bytes once and stores a web-ready copy.
+
+    The image is rotated per its EXIF orientation, downscaled to `max_dimension`,
+    re-encoded without metadata and written as `<stem><ext>` with the extension
+    of the format actually used. When nothing had to be rotated or downscaled and
+    the re-encode is not smaller, the original bytes are kept instead. Optional
+    narrower variants are written next to it as `<stem>_<width>w<ext>`.
+
+    Raises:
+        OSError: If the bytes are not a decodable image.
+    """
+    config = config or ImageNormalizeConfig()
+    destination_stem = Path(destination_stem)
+    destination_stem.parent.mkdir(parents=True, exist_ok=True)
+
+    image = Image.open(io.BytesIO(data))
+    source_format = image.format
+    rotated = image.getexif().get(0x0112, 1) != 1
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        has_alpha = "transparency" in image.info or image.mode in ("PA", "RGBa", "La")
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    resized = max(image.size) > config.max_dimension
+    if resized:
+        image.thumbnail((config.max_dimension, config.max_dimension), Image.LANCZOS)
+
+    format = _choose_format(image, config)
+    # Pillow only writes metadata that is passed explicitly, so a fresh encode drops EXIF/ICC/text chunks
+    encoded = _encode(image, format, config)
+    keep_original = (
+        not resized and not rotated and source_format in EXTENSIONS
+        and config.format in ("auto", source_format.lower()) and len(data) <= len(encoded)
+    )
+    if keep_original:
+        # Small or already well-compressed sources (e.g. palette PNGs) grow when re-encoded
+        logger.info(f"Re-encoding {source_format} as {format} would not shrink it ({len(data)} -> {len(encoded)} bytes), keeping the original")
+        format, encoded = source_format, data
+    extension = EXTENSIONS[format]
+    path = destination_stem.with_name(destination_stem.name + extension)
+    _write_atomic(path, encoded)
+
+    variants = []
+    for width in sorted(config.variant_widths):
+        if width >= image.width:
+            continue
+        variant = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        variant_path = destination_stem.with_name(f"{destination_stem.name}_{width}w{extension}")
+        _write_atomic(variant_path, _encode(variant, format, config))
+        variants.append(variant_path)
+
+    logger.info(f"Normalized image {len(data)} -> {len(encoded)} bytes ({format} {image.width}x{image.height}) at {path}")
+    return NormalizedImage(path, format, image.size, variants)
@@ -0,0 +1,121 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import JobQueueConfig
+
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+import threading
+import time
+import uuid
+
+
+class Job:
+    """
+    A unit of background work plus the ordered list of progress events it has published.
+    """
+
+    FINISHED = ("succeeded", "failed")
+
+    def __init__(self, kind: str, payload: dict):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.events = []
+        self.condition = threading.Condition()
+        self.publish({"type": "status", "status": self.status})
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.FINISHED
+
+    def publish(self, event: dict) -> None:
+        """Appends a progress event and wakes up any stream waiting on this job."""
+        with self.condition:
+            self.events.append({"seq": len(self.events), "time": time.time(), **event})
+            self.condition.notify_all()
+
+    def set_status(self, status: str, **fields: Any) -> None:
+        # Status and its event change together, so a stream that sees a finished job also sees the final event
+        with self.condition:
+            self.status = status
+            self.publish({"type": "status", "status": status, **fields})
+
+    def wait_for_events(self, after: int, timeout: float) -> List[dict]:
+        """
+        Returns events with `seq` greater than `after`, blocking up to `timeout`
+        seconds when there are none yet.
+        """
+        with self.condition:
+            if len(self.events) <= after + 1 and not self.finished:
+                self.condition.wait(timeout)
+            return self.events[after + 1:]
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "payload": self.payload,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+            "events": len(self.events),
+        }
+
+
+class JobQueue:
+    """
+    In-process work queue backed by a thread pool.
+
+    Request handlers submit a callable and get a job id back immediately; the
+    callable runs on a worker thread and receives the job so it can publish
+    progress events.
+    """
+
+    def __init__(self, config: Optional[JobQueueConfig] = None):
+        self.config = config or JobQueueConfig()
+        self.pool = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="job")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[[Job], Any], payload: Optional[dict] = None) -> Job:
+        job = Job(kind, payload or {})
+        with self.lock:
+            self.jobs[job.id] = job
+            self._trim()
+        self.pool.submit(self._run, job, fn)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        job.started_at = time.time()
+        job.set_status("running")
+        try:
+            job.result = fn(job)
+            job.finished_at = time.time()
+            job.set_status("succeeded", result=job.result)
+        except Exception as e:
+            logger.error(f"{job.kind} job {job.id} failed: {e}")
+            job.error = str(e)
+            job.finished_at = time.time()
+            job.set_status("failed", error=job.error)
+
+    def _trim(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        overflow = len(self.jobs) - self.config.max_retained_jobs
+        for job_id in finished[:max(overflow, 0)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,247 @@
+from SinisterSixSystems.logging import logger
+from SinisterSixSystems.config import LLMCacheConfig
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+from typing import Any, Dict, Optional
+from pathlib import Path
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed store for LLM responses shared by every call site.
+
+    Lookups are exact-match on (rendered prompt, llm configuration). When the
+    semantic tier is enabled, an exact miss falls back to the most similar stored
+    prompt for the same llm configuration above a cosine-similarity threshold.
+    Entries expire after `ttl_seconds` and the least recently used ones are
+    evicted once `max_entries` is exceeded.
+    """
+
+    def __init__(self, config: Optional[LLMCacheConfig] = None):
+        self.config = config or LLMCacheConfig()
+        Path(self.config.path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.config.path, check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                call_site TEXT,
+                llm_string TEXT,
+                response TEXT,
+                embedding TEXT,
+                created_at REAL,
+                accessed_at REAL
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_llm_string ON llm_cache (llm_string)")
+        self.connection.commit()
+
+        self.metrics = {}
+        self.embeddings = None
+        self.updates_since_eviction = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _count(self, call_site: str, counter: str) -> None:
+        with self.lock:
+            site = self.metrics.setdefault(call_site, {"hits": 0, "semantic_hits": 0, "misses": 0})
+            site[counter] += 1
+
+    @staticmethod
+    def _prompt_text(prompt: str) -> str:
+        """Extracts the message contents from a serialized chat prompt for embedding."""
+        try:
+            messages = json.loads(prompt)
+            parts = [message.get("kwargs", {}).get("content", "") for message in messages]
+            return "\n".join(part for part in parts if isinstance(part, str)) or prompt
+        except (ValueError, AttributeError, TypeError):
+            return prompt
+
+    def _embed(self, prompt: str) -> Optional[list]:
+        if not self.config.semantic_enabled:
+            return None
+        try:
+            if self.embeddings is None:
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                self.embeddings = GoogleGenerativeAIEmbeddings(model=self.config.embedding_model)
+            return self.embeddings.embed_query(self._prompt_text(prompt))
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None
+
+    @staticmethod
+    def _cosine(a: list, b: list) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def _semantic_lookup(self, prompt: str, llm_string: str, expires_before: float) -> Optional[tuple]:
+        embedding = self._embed(prompt)
+        if embedding is None:
+            return None
+
+        with self.lock:
+            rows = self.connection.execute(
+                """
+                SELECT key, response, embedding FROM llm_cache
+                WHERE llm_string = ? AND embedding IS NOT NULL AND created_at >= ?
+                ORDER BY accessed_at DESC LIMIT ?
+                """,
+                (llm_string, expires_before, self.config.semantic_scan_limit),
+            ).fetchall()
+
+        best, best_score = None, self.config.semantic_threshold
+        for key, response, stored in rows:
+            score = self._cosine(embedding, json.loads(stored))
+            if score >= best_score:
+                best, best_score = (key, response), score
+        return best
+
+    def lookup(self, prompt: str, llm_string: str, call_site: str = "default") -> Optional[RETURN_VAL_TYPE]:
+        expires_before = time.time() - self.config.ttl_seconds
+        key = self._key(prompt, llm_string)
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, expires_before),
+            ).fetchone()
+
+        counter = "hits"
+        if row is None:
+            semantic = self._semantic_lookup(prompt, llm_string, expires_before)
+            if semantic is None:
+                self._count(call_site, "misses")
+                return None
+            key, response = semantic
+            counter = "semantic_hits"
+        else:
+            response = row[0]
+
+        try:
+            generations = loads(response)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable LLM cache entry: {e}")
+            self._count(call_site, "misses")
+            return None
+
+        with self.lock:
+            self.connection.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.connection.commit()
+        self._count(call_site, counter)
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE, call_site: str = "default") -> None:
+        embedding = self._embed(prompt)
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self._key(prompt, llm_string),
+                    call_site,
+                    llm_string,
+                    dumps(return_val),
+                    json.dumps(embedding) if embedding is not None else None,
+                    now,
+                    now,
+                ),
+            )
+            self.connection.commit()
+            self.updates_since_eviction += 1
+            should_evict = self.updates_since_eviction >= 100
+
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drops expired entries and trims the table to `max_entries`."""
+        with self.lock:
+            self.connection.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.config.ttl_seconds,))
+            self.connection.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.config.max_entries,),
+            )
+            self.connection.commit()
+            self.updates_since_eviction = 0
+
+    def clear(self, call_site: Optional[str] = None) -> None:
+        with self.lock:
+            if call_site is None:
+                self.connection.execute("DELETE FROM llm_cache")
+            else:
+                self.connection.execute("DELETE FROM llm_cache WHERE call_site = ?", (call_site,))
+            self.connection.commit()
+
+    def stats(self) -> Dict[str, dict]:
+        with self.lock:
+            metrics = {site: dict(counters) for site, counters in self.metrics.items()}
+            entries = self.connection.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+        for counters in metrics.values():
+            lookups = counters["hits"] + counters["semantic_hits"] + counters["misses"]
+            counters["hit_rate"] = round((counters["hits"] + counters["semantic_hits"]) / lookups, 3) if lookups else 0.0
+        return {"entries": entries, "call_sites": metrics}
+
+
+class CallSiteCache(BaseCache):
+    """
+    LangChain cache adapter that tags lookups with the call site using it,
+    so hit rates can be reported per call site.
+    """
+
+    def __init__(self, store: LLMResponseCache, call_site: str):
+        self.store = store
+        self.call_site = call_site
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.store.lookup(prompt, llm_string, call_site=self.call_site)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.store.update(prompt, llm_string, return_val, call_site=self.call_site)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear(call_site=self.call_site)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """Returns the process-wide LLM response store, creating it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = LLMResponseCache()
+    return _store
+
+
+def get_llm_cache(call_site: str) -> Optional[CallSiteCache]:
+    """
+    Returns a cache to pass as `cache=` to a chat model constructor, or None when caching is disabled.
+
+    Args:
+        call_site (str): Name used to report hit rates for this construction site.
+    """
+    if not LLMCacheConfig().enabled:
+        return None
+    return CallSiteCache(get_llm_response_cache(), call_site)
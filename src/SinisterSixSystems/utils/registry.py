@@ -0,0 +1,157 @@
+from SinisterSixSystems.logging import logger
+
+from typing import Any, Callable, Dict
+import inspect
+import os
+import threading
+import time
+
+
+def _rss_bytes() -> int:
+    """Resident set size of the current process, 0 when it cannot be read."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, AttributeError):
+        return 0
+
+
+def _parameter_bytes(instance: Any) -> int:
+    """
+    Size of torch parameters/buffers held by `instance` (or its `.model`), 0 if not a torch module.
+    Only already-loaded models are sized; a lazy `model` property is never triggered.
+    """
+    model = inspect.getattr_static(instance, "model", None)
+    if isinstance(model, property):
+        model = getattr(instance, "_model", None)
+    for candidate in (instance, model):
+        if candidate is not None and hasattr(candidate, "parameters") and hasattr(candidate, "buffers"):
+            try:
+                tensors = list(candidate.parameters()) + list(candidate.buffers())
+                return sum(t.numel() * t.element_size() for t in tensors)
+            except Exception:
+                continue
+    return 0
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of heavy objects (LLM clients, agents, compiled
+    LangGraph workflows, TTS weights).
+
+    Each entry is built lazily by its factory the first time it is requested and
+    the same instance is handed out afterwards. Construction is guarded by a
+    per-entry lock so concurrent requests never load the same model twice.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        entry = self.entries.get(name)
+        if entry is not None:
+            return entry["instance"]
+
+        with self.lock:
+            entry_lock = self.locks.setdefault(name, threading.Lock())
+
+        with entry_lock:
+            entry = self.entries.get(name)
+            if entry is not None:
+                return entry["instance"]
+
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            instance = factory()
+            load_seconds = time.perf_counter() - started
+
+            # Parameter size is exact for torch models; RSS delta is an approximation otherwise
+            memory_bytes = _parameter_bytes(instance) or max(_rss_bytes() - rss_before, 0)
+
+            self.entries[name] = {
+                "instance": instance,
+                "type": type(instance).__name__,
+                "loaded_at": time.time(),
+                "load_seconds": round(load_seconds, 3),
+                "memory_bytes": memory_bytes,
+            }
+            logger.info(f"Registry loaded '{name}' in {load_seconds:.2f}s (~{memory_bytes / (1024 * 1024):.1f} MiB)")
+            return instance
+
+    def evict(self, name: str) -> None:
+        with self.lock:
+            self.entries.pop(name, None)
+
+    def loaded(self) -> Dict[str, dict]:
+        """Summary of every loaded entry without the instances themselves."""
+        summary = {
+            name: {key: value for key, value in entry.items() if key != "instance"}
+            for name, entry in list(self.entries.items())
+        }
+        return {
+            "entries": summary,
+            "total_memory_bytes": sum(entry["memory_bytes"] for entry in summary.values()),
+            "process_rss_bytes": _rss_bytes(),
+        }
+
+
+registry = ModelRegistry()
+
+
+def get_chat_model(call_site: str, model: str = "gemini-2.5-flash", temperature: float = 0.0):
+    """Shared ChatGoogleGenerativeAI client for a call site (opted into the LLM response cache)."""
+    def factory():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from SinisterSixSystems.utils.llm_cache import get_llm_cache
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            cache=get_llm_cache(call_site),
+        )
+    return registry.get(f"chat_model:{call_site}:{model}:{temperature}", factory)
+
+
+def get_graph_generator():
+    def factory():
+        from SinisterSixSystems.orchestration.graph_generator import GraphGenerator
+        return GraphGenerator()
+    return registry.get("graph_generator", factory)
+
+
+def get_graph_workflow():
+    """Pre-compiled GraphGenerator StateGraph."""
+    return registry.get("graph_workflow", lambda: get_graph_generator().compile())
+
+
+def get_flowchart_agent():
+    def factory():
+        from SinisterSixSystems.mermaid_flowchart import FlowchartAgent
+        return FlowchartAgent()
+    return registry.get("flowchart_agent", factory)
+
+
+def get_tts():
+    def factory():
+        from SinisterSixSystems.components.tts import TTS
+        return TTS()
+    return registry.get("tts", factory)
+
+
+def get_audio_agent():
+    def factory():
+        from SinisterSixSystems.orchestration.audio_agent import AudioAgent
+        return AudioAgent()
+    return registry.get("audio_agent", factory)
+
+
+def get_audio_workflow():
+    """Pre-compiled AudioAgent StateGraph."""
+    return registry.get("audio_workflow", lambda: get_audio_agent().compile())